@@ -5,15 +5,19 @@ Models serialization latency and throughput impacts without actual data transfor
 
 import time
 import math
-from typing import Any, Dict, Optional
-from dataclasses import dataclass
+from array import array
+from collections import deque
+from functools import lru_cache
+from operator import attrgetter
+from typing import Any, Callable, Dict, FrozenSet, Optional, Tuple
+from dataclasses import dataclass, fields, is_dataclass
 from enum import Enum
 from abc import ABC, abstractmethod
 
-from tracing import trace_logger
+from tracing import DictFields, trace_logger
 
 
-class SerializationFormat(Enum):
+class SerializationFormat(str, Enum):
     """Serialization format types"""
     CDR = "cdr"
     JSON = "json"
@@ -21,6 +25,20 @@ class SerializationFormat(Enum):
     MSGPACK = "msgpack"
 
 
+# Position of each format in SerializationConfig.format_multipliers
+_FORMAT_ORDINAL: Dict[SerializationFormat, int] = {
+    fmt: i for i, fmt in enumerate(SerializationFormat)
+}
+
+# Default format multipliers, in SerializationFormat order
+_DEFAULT_FORMAT_MULTIPLIERS: Tuple[float, ...] = (
+    1.0,  # CDR - baseline (fastest)
+    2.5,  # JSON - 150% slower
+    1.2,  # PROTOBUF - 20% slower
+    1.1,  # MSGPACK - 10% slower
+)
+
+
 @dataclass
 class SerializationConfig:
     """Configuration for serialization performance modeling"""
@@ -36,17 +54,93 @@ class SerializationConfig:
     cpu_overhead_factor: float = 1.0
     memory_overhead_factor: float = 1.0
     
-    # Format-specific multipliers
-    format_multipliers: Dict[SerializationFormat, float] = None
+    # Format-specific multipliers, in SerializationFormat order (see _FORMAT_ORDINAL)
+    format_multipliers: Tuple[float, ...] = _DEFAULT_FORMAT_MULTIPLIERS
     
     def __post_init__(self):
-        if self.format_multipliers is None:
-            self.format_multipliers = {
-                SerializationFormat.CDR: 1.0,        # Baseline (fastest)
-                SerializationFormat.PROTOBUF: 1.2,   # 20% slower
-                SerializationFormat.JSON: 2.5,       # 150% slower
-                SerializationFormat.MSGPACK: 1.1,    # 10% slower
-            }
+        # Accept the {SerializationFormat: multiplier} mapping form as well
+        if isinstance(self.format_multipliers, dict):
+            given = self.format_multipliers
+            self.format_multipliers = tuple(
+                given.get(fmt, _DEFAULT_FORMAT_MULTIPLIERS[i])
+                for fmt, i in _FORMAT_ORDINAL.items()
+            )
+
+
+# Fixed serialized sizes keyed on exact type, consulted before any isinstance checks
+_SIZE_TABLE: Dict[type, int] = {
+    type(None): 4,  # Null indicator
+    bool: 1,
+    float: 8,
+}
+
+# Fields for serialize/deserialize performance events (formatted lazily)
+_PERFORMANCE_FIELDS = DictFields('format', 'size_bytes', 'latency_us',
+                                 'cpu_cycles', 'memory_bytes', 'throughput_mbps')
+
+# Adaptive serialize event: performance fields plus the applied load penalty
+_ADAPTIVE_FIELDS = DictFields('format', 'size_bytes', 'latency_us',
+                              'cpu_cycles', 'memory_bytes', 'throughput_mbps',
+                              'original_latency_us', 'system_load', 'message_rate',
+                              'performance_penalty')
+
+# Enumerations are encoded as a uint32 regardless of member value
+_ENUM_SIZE = 4
+
+# Signed integer width indexed by magnitude bit length (capped at 32 -> 8 bytes)
+_INT_SIZE = (1,) * 8 + (2,) * 8 + (4,) * 16 + (8,)
+
+
+@lru_cache(maxsize=256)
+def _dataclass_field_getter(cls: type) -> Callable[[Any], tuple]:
+    """C-level getter returning a dataclass's public field values as a tuple"""
+    names = tuple(f.name for f in fields(cls) if not f.name.startswith('_'))
+    if not names:
+        return lambda obj: ()
+    if len(names) == 1:
+        # attrgetter with a single name returns the bare value, not a tuple
+        getter = attrgetter(names[0])
+        return lambda obj: (getter(obj),)
+    return attrgetter(*names)
+
+
+@lru_cache(maxsize=256)
+def _fixed_layout_size(cls: type) -> Optional[int]:
+    """Constant size of a dataclass whose fields are all fixed-width, else None.
+    
+    Fixed-layout classes (Twist, Pose, Bool, ...) are registered in _SIZE_TABLE
+    so later instances are sized by a single table lookup.
+    """
+    total = 20  # Object overhead
+    for f in fields(cls):
+        if f.name.startswith('_'):
+            continue
+        field_type = f.type
+        if field_type is float:
+            total += 8
+        elif field_type is bool:
+            total += 1
+        elif isinstance(field_type, type) and issubclass(field_type, Enum):
+            total += _ENUM_SIZE
+        else:
+            return None
+    _SIZE_TABLE[cls] = total
+    return total
+
+
+@lru_cache(maxsize=512)
+def _class_public_attrs(cls: type) -> FrozenSet[str]:
+    """Public names defined on a class or its bases, computed once per class"""
+    return frozenset(a for a in dir(cls) if not a.startswith('_'))
+
+
+class _Leave:
+    """Stack marker popped once every child of a walked container is sized"""
+    __slots__ = ('container',)
+    
+    def __init__(self, container: Any):
+        # Holding the container keeps its id() from being reused mid-walk
+        self.container = container
 
 
 @dataclass
@@ -55,42 +149,103 @@ class MessageSize:
     
     @staticmethod
     def estimate_size(data: Any) -> int:
-        """Estimate serialized size in bytes"""
-        if data is None:
-            return 4  # Null indicator
-        elif isinstance(data, bool):
-            return 1
-        elif isinstance(data, int):
-            if -128 <= data <= 127:
-                return 1
-            elif -32768 <= data <= 32767:
-                return 2
-            elif -2147483648 <= data <= 2147483647:
-                return 4
+        """Estimate serialized size in bytes.
+        
+        Shared references are counted once per occurrence; a container that
+        contains itself raises ValueError.
+        """
+        size_table = _SIZE_TABLE
+        total = 0
+        stack = [data]
+        push = stack.append
+        pop = stack.pop
+        extend = stack.extend
+        
+        # Ids of the containers on the current descent path
+        active = set()
+        
+        def enter(container: Any) -> None:
+            key = id(container)
+            if key in active:
+                raise ValueError("Circular reference detected in message data")
+            active.add(key)
+            push(_Leave(container))
+        
+        while stack:
+            item = pop()
+            item_type = type(item)
+            
+            size = size_table.get(item_type)
+            if size is not None:
+                total += size
+                continue
+            
+            if item_type is _Leave:
+                active.discard(id(item.container))
+            elif item_type is list or item_type is tuple:
+                total += 4  # Length prefix
+                if not item:
+                    continue
+                # Homogeneous fixed-size sequences (e.g. float arrays) need no walk
+                elem_size = size_table.get(type(item[0]))
+                if elem_size is not None and all(type(x) is type(item[0]) for x in item):
+                    total += len(item) * elem_size
+                else:
+                    enter(item)
+                    extend(item)
+            elif item_type is dict:
+                total += 4
+                enter(item)
+                extend(item.keys())
+                extend(item.values())
+            elif item_type is array:
+                # Contiguous typed buffer: exact payload size, no per-element walk
+                total += len(item) * item.itemsize + 4
+            elif isinstance(item, Enum):
+                size_table[item_type] = _ENUM_SIZE
+                total += _ENUM_SIZE
+            elif isinstance(item, int):
+                # ~item maps -128 onto 127 so both share the 1-byte slot
+                bits = (item if item >= 0 else ~item).bit_length()
+                total += _INT_SIZE[bits if bits < 32 else 32]
+            elif isinstance(item, float):
+                total += 8
+            elif isinstance(item, str):
+                total += len(item.encode('utf-8')) + 4  # String + length prefix
+            elif isinstance(item, bytes):
+                total += len(item) + 4  # Bytes + length prefix
+            elif isinstance(item, (list, tuple)):
+                total += 4
+                enter(item)
+                extend(item)
+            elif isinstance(item, dict):
+                total += 4
+                enter(item)
+                extend(item.keys())
+                extend(item.values())
+            elif is_dataclass(item_type):
+                fixed = _fixed_layout_size(item_type)
+                if fixed is not None:
+                    total += fixed
+                else:
+                    # Walk declared fields only (works for slotted dataclasses too)
+                    total += 20  # Object overhead
+                    enter(item)
+                    extend(_dataclass_field_getter(item_type)(item))
+            elif hasattr(item, '__dict__'):
+                # Plain object: class-level names are cached, instance names added
+                total += 20
+                enter(item)
+                class_attrs = _class_public_attrs(item_type)
+                for attr in class_attrs:
+                    push(getattr(item, attr, None))
+                for attr in item.__dict__:
+                    if not attr.startswith('_') and attr not in class_attrs:
+                        push(getattr(item, attr, None))
             else:
-                return 8
-        elif isinstance(data, float):
-            return 8
-        elif isinstance(data, str):
-            return len(data.encode('utf-8')) + 4  # String + length prefix
-        elif isinstance(data, bytes):
-            return len(data) + 4  # Bytes + length prefix
-        elif isinstance(data, (list, tuple)):
-            return 4 + sum(MessageSize.estimate_size(item) for item in data)
-        elif isinstance(data, dict):
-            return 4 + sum(
-                MessageSize.estimate_size(k) + MessageSize.estimate_size(v) 
-                for k, v in data.items()
-            )
-        elif hasattr(data, '__dict__'):
-            # Dataclass or object
-            return sum(
-                MessageSize.estimate_size(getattr(data, attr, None))
-                for attr in dir(data) 
-                if not attr.startswith('_')
-            ) + 20  # Object overhead
-        else:
-            return 50  # Default estimate for unknown types
+                total += 50  # Default estimate for unknown types
+        
+        return total
 
 
 class AbstractSerializer(ABC):
@@ -99,8 +254,27 @@ class AbstractSerializer(ABC):
     def __init__(self, config: SerializationConfig, format_type: SerializationFormat):
         self.config = config
         self.format = format_type
-        self.format_multiplier = config.format_multipliers[format_type]
+        self.format_multiplier = config.format_multipliers[_FORMAT_ORDINAL[format_type]]
+        
+        # Constant pieces of the placeholder payloads and trace fields
+        self._format_value = format_type.value
+        self._ser_prefix = f"<serialized_{self._format_value}_"
+        self._deser_prefix = "<deserialized_data_"
         
+        # Optional flag, resolved once instead of probed on every call
+        self._real_time: bool = bool(getattr(config, 'real_time_simulation', False))
+
+        # Latency model constants; the config is treated as fixed once bound.
+        # total = base * multiplier * (1 + cpu_overhead) + size / throughput
+        self._ser_base_us = (config.base_serialize_latency_us * self.format_multiplier
+                             * (1.0 + config.cpu_overhead_factor))
+        self._deser_base_us = (config.base_deserialize_latency_us * self.format_multiplier
+                               * (1.0 + config.cpu_overhead_factor))
+        self._inv_ser_tput = 1.0 / config.serialize_throughput_bps_us
+        self._inv_deser_tput = 1.0 / config.deserialize_throughput_bps_us
+        self._mem_ser_factor = 1.5 + config.memory_overhead_factor
+        self._mem_deser_factor = 1.2 + config.memory_overhead_factor
+
     @abstractmethod
     def serialize(self, data: Any) -> 'SerializationResult':
         """Serialize data and return performance metrics"""
@@ -140,97 +314,85 @@ class PerformanceSerializer(AbstractSerializer):
             config = SerializationConfig()
         super().__init__(config, format_type)
         
-    def serialize(self, data: Any) -> SerializationResult:
-        """Model serialization performance"""
-        start_time = time.time()
-        
-        # Estimate message size
-        size_bytes = MessageSize.estimate_size(data)
-        
-        # Calculate latency components
-        base_latency = self.config.base_serialize_latency_us * self.format_multiplier
-        throughput_latency = size_bytes / self.config.serialize_throughput_bps_us
-        cpu_overhead = base_latency * self.config.cpu_overhead_factor
-        
-        total_latency_us = base_latency + throughput_latency + cpu_overhead
+    def _serialize_model(self, size_bytes: int, latency_penalty: float = 1.0,
+                         mem_penalty: float = 1.0) -> SerializationResult:
+        """Compute serialization metrics for a message of size_bytes"""
+        # Base + CPU overhead is precomputed; only the throughput term varies
+        total_latency_us = (self._ser_base_us + size_bytes * self._inv_ser_tput) * latency_penalty
         
         # Estimate CPU cycles (assuming 3GHz CPU)
         cpu_cycles = int(total_latency_us * 3.0)  # 3 cycles per microsecond
         
         # Estimate memory usage (input + output + overhead)
-        memory_bytes = int(size_bytes * (1.5 + self.config.memory_overhead_factor))
+        memory_bytes = int(size_bytes * self._mem_ser_factor * mem_penalty)
         
         # Simulate serialization delay in real-time simulation
-        if hasattr(self.config, 'real_time_simulation') and self.config.real_time_simulation:
+        if self._real_time:
             time.sleep(total_latency_us / 1e6)
             
         # Create placeholder serialized data (for performance modeling)
-        serialized_data = f"<serialized_{self.format.value}_{size_bytes}_bytes>"
-        
-        # Log performance event
-        trace_logger.log_event(
-            "serialize_performance",
-            {
-                "format": self.format.value,
-                "size_bytes": size_bytes,
-                "latency_us": total_latency_us,
-                "cpu_cycles": cpu_cycles,
-                "memory_bytes": memory_bytes,
-                "throughput_mbps": (size_bytes * 8) / total_latency_us if total_latency_us > 0 else 0
-            }
-        )
-        
         return SerializationResult(
-            serialized_data=serialized_data,
+            serialized_data=self._ser_prefix + str(size_bytes) + "_bytes>",
             size_bytes=size_bytes,
             latency_us=total_latency_us,
             cpu_cycles=cpu_cycles,
             memory_bytes=memory_bytes
         )
         
-    def deserialize(self, data: Any, size_bytes: int) -> DeserializationResult:
-        """Model deserialization performance"""
-        start_time = time.time()
-        
-        # Calculate latency components  
-        base_latency = self.config.base_deserialize_latency_us * self.format_multiplier
-        throughput_latency = size_bytes / self.config.deserialize_throughput_bps_us
-        cpu_overhead = base_latency * self.config.cpu_overhead_factor
-        
-        total_latency_us = base_latency + throughput_latency + cpu_overhead
+    def _deserialize_model(self, size_bytes: int, latency_penalty: float = 1.0,
+                           mem_penalty: float = 1.0) -> DeserializationResult:
+        """Compute deserialization metrics for a message of size_bytes"""
+        total_latency_us = (self._deser_base_us + size_bytes * self._inv_deser_tput) * latency_penalty
         
         # Estimate CPU cycles
         cpu_cycles = int(total_latency_us * 3.0)
         
         # Estimate memory usage
-        memory_bytes = int(size_bytes * (1.2 + self.config.memory_overhead_factor))
+        memory_bytes = int(size_bytes * self._mem_deser_factor * mem_penalty)
         
         # Simulate deserialization delay
-        if hasattr(self.config, 'real_time_simulation') and self.config.real_time_simulation:
+        if self._real_time:
             time.sleep(total_latency_us / 1e6)
             
         # Create placeholder deserialized data
-        deserialized_data = f"<deserialized_data_{size_bytes}_bytes>"
-        
-        # Log performance event
-        trace_logger.log_event(
-            "deserialize_performance", 
-            {
-                "format": self.format.value,
-                "size_bytes": size_bytes,
-                "latency_us": total_latency_us,
-                "cpu_cycles": cpu_cycles,
-                "memory_bytes": memory_bytes,
-                "throughput_mbps": (size_bytes * 8) / total_latency_us if total_latency_us > 0 else 0
-            }
-        )
-        
         return DeserializationResult(
-            deserialized_data=deserialized_data,
+            deserialized_data=self._deser_prefix + str(size_bytes) + "_bytes>",
             latency_us=total_latency_us,
             cpu_cycles=cpu_cycles,
             memory_bytes=memory_bytes
         )
+        
+    def serialize(self, data: Any) -> SerializationResult:
+        """Model serialization performance"""
+        # Estimate message size
+        size_bytes = MessageSize.estimate_size(data)
+        result = self._serialize_model(size_bytes)
+        
+        # Log performance event
+        latency = result.latency_us
+        trace_logger.log_event_values(
+            "serialize_performance",
+            _PERFORMANCE_FIELDS,
+            (self._format_value, size_bytes, latency, result.cpu_cycles, result.memory_bytes,
+             (size_bytes * 8) / latency if latency > 0 else 0)
+        )
+        
+        return result
+        
+    def deserialize(self, data: Any, size_bytes: int) -> DeserializationResult:
+        """Model deserialization performance"""
+        result = self._deserialize_model(size_bytes)
+        
+        # Log performance event
+        latency = result.latency_us
+        trace_logger.log_event_values(
+            "deserialize_performance",
+            _PERFORMANCE_FIELDS,
+            (self._format_value, size_bytes, latency, result.cpu_cycles, result.memory_bytes,
+             (size_bytes * 8) / latency if latency > 0 else 0)
+        )
+        
+        return result
 
 
 class AdaptiveSerializer(PerformanceSerializer):
@@ -251,47 +413,43 @@ class AdaptiveSerializer(PerformanceSerializer):
         
     def serialize(self, data: Any) -> SerializationResult:
         """Serialize with adaptive performance based on system conditions"""
-        # Get base result
-        result = super().serialize(data)
+        size_bytes = MessageSize.estimate_size(data)
         
-        # Apply system load penalties
+        # System load penalties, applied inside the model in a single pass
         load_penalty = 1.0 + (self.system_load * 2.0)  # Up to 3x slower under full load
         rate_penalty = 1.0 + min(self.message_rate / 1000.0, 1.0)  # Penalty for high message rates
-        
         total_penalty = load_penalty * rate_penalty
         
-        # Adjust performance metrics
-        result.latency_us *= total_penalty
-        result.cpu_cycles = int(result.cpu_cycles * total_penalty)
-        result.memory_bytes = int(result.memory_bytes * (1.0 + self.system_load * 0.5))
+        result = self._serialize_model(size_bytes, total_penalty, 1.0 + self.system_load * 0.5)
         
-        # Log adaptive performance
-        trace_logger.log_event(
+        # Log adaptive performance (one event carrying both base and adjusted figures)
+        latency = result.latency_us
+        trace_logger.log_event_values(
             "adaptive_serialize_performance",
-            {
-                "original_latency_us": result.latency_us / total_penalty,
-                "adjusted_latency_us": result.latency_us,
-                "system_load": self.system_load,
-                "message_rate": self.message_rate,
-                "performance_penalty": total_penalty
-            }
+            _ADAPTIVE_FIELDS,
+            (self._format_value, size_bytes, latency, result.cpu_cycles, result.memory_bytes,
+             (size_bytes * 8) / latency if latency > 0 else 0,
+             latency / total_penalty, self.system_load, self.message_rate, total_penalty)
         )
         
         return result
         
     def deserialize(self, data: Any, size_bytes: int) -> DeserializationResult:
         """Deserialize with adaptive performance"""
-        result = super().deserialize(data, size_bytes)
-        
         # Apply similar penalties as serialization
         load_penalty = 1.0 + (self.system_load * 1.5)  # Deserialization less affected
         rate_penalty = 1.0 + min(self.message_rate / 1500.0, 0.8)
-        
         total_penalty = load_penalty * rate_penalty
         
-        result.latency_us *= total_penalty
-        result.cpu_cycles = int(result.cpu_cycles * total_penalty)
-        result.memory_bytes = int(result.memory_bytes * (1.0 + self.system_load * 0.3))
+        result = self._deserialize_model(size_bytes, total_penalty, 1.0 + self.system_load * 0.3)
+        
+        latency = result.latency_us
+        trace_logger.log_event_values(
+            "deserialize_performance",
+            _PERFORMANCE_FIELDS,
+            (self._format_value, size_bytes, latency, result.cpu_cycles, result.memory_bytes,
+             (size_bytes * 8) / latency if latency > 0 else 0)
+        )
         
         return result
 
@@ -299,49 +457,72 @@ class AdaptiveSerializer(PerformanceSerializer):
 class SerializationProfiler:
     """Profiler for analyzing serialization performance patterns"""
     
-    def __init__(self):
-        self.serialization_stats = []
-        self.deserialization_stats = []
+    def __init__(self, history_size: int = 1024):
+        # Running aggregates keep the summary O(1) regardless of run length
+        self._ser = {'count': 0, 'sum_lat': 0.0, 'min_lat': math.inf, 'max_lat': 0.0, 'sum_bytes': 0}
+        self._deser = {'count': 0, 'sum_lat': 0.0, 'min_lat': math.inf, 'max_lat': 0.0}
+        
+        # Bounded history of the most recent records for inspection
+        self.serialization_stats = deque(maxlen=history_size)
+        self.deserialization_stats = deque(maxlen=history_size)
         
     def record_serialization(self, data_type: str, result: SerializationResult):
         """Record serialization performance"""
+        latency = result.latency_us
+        agg = self._ser
+        agg['count'] += 1
+        agg['sum_lat'] += latency
+        agg['sum_bytes'] += result.size_bytes
+        if latency < agg['min_lat']:
+            agg['min_lat'] = latency
+        if latency > agg['max_lat']:
+            agg['max_lat'] = latency
+            
         self.serialization_stats.append({
             'timestamp': time.time(),
             'data_type': data_type,
             'size_bytes': result.size_bytes,
-            'latency_us': result.latency_us,
-            'throughput_mbps': (result.size_bytes * 8) / result.latency_us if result.latency_us > 0 else 0
+            'latency_us': latency,
+            'throughput_mbps': (result.size_bytes * 8) / latency if latency > 0 else 0
         })
         
     def record_deserialization(self, data_type: str, result: DeserializationResult):
         """Record deserialization performance"""
+        latency = result.latency_us
+        agg = self._deser
+        agg['count'] += 1
+        agg['sum_lat'] += latency
+        if latency < agg['min_lat']:
+            agg['min_lat'] = latency
+        if latency > agg['max_lat']:
+            agg['max_lat'] = latency
+            
         self.deserialization_stats.append({
             'timestamp': time.time(),
             'data_type': data_type,
-            'latency_us': result.latency_us,
+            'latency_us': latency,
         })
         
     def get_performance_summary(self) -> Dict:
         """Get performance summary statistics"""
-        if not self.serialization_stats:
+        ser = self._ser
+        deser = self._deser
+        if not ser['count']:
             return {"error": "No data recorded"}
-            
-        serialize_latencies = [s['latency_us'] for s in self.serialization_stats]
-        deserialize_latencies = [d['latency_us'] for d in self.deserialization_stats]
         
         return {
             'serialization': {
-                'count': len(serialize_latencies),
-                'avg_latency_us': sum(serialize_latencies) / len(serialize_latencies),
-                'max_latency_us': max(serialize_latencies),
-                'min_latency_us': min(serialize_latencies),
-                'total_bytes': sum(s['size_bytes'] for s in self.serialization_stats)
+                'count': ser['count'],
+                'avg_latency_us': ser['sum_lat'] / ser['count'],
+                'max_latency_us': ser['max_lat'],
+                'min_latency_us': ser['min_lat'],
+                'total_bytes': ser['sum_bytes']
             },
             'deserialization': {
-                'count': len(deserialize_latencies),
-                'avg_latency_us': sum(deserialize_latencies) / len(deserialize_latencies) if deserialize_latencies else 0,
-                'max_latency_us': max(deserialize_latencies) if deserialize_latencies else 0,
-                'min_latency_us': min(deserialize_latencies) if deserialize_latencies else 0,
+                'count': deser['count'],
+                'avg_latency_us': deser['sum_lat'] / deser['count'] if deser['count'] else 0,
+                'max_latency_us': deser['max_lat'] if deser['count'] else 0,
+                'min_latency_us': deser['min_lat'] if deser['count'] else 0,
             }
         }
 
@@ -3,14 +3,27 @@ Action-related messages for ROS2 DEVS simulation.
 """
 
 from dataclasses import dataclass, field
-from enum import Enum
+from enum import IntEnum
 from typing import Any, Optional, List
+import itertools
 import uuid
 import time
 
 from message import MessageType
+from configuration import config
 
-class GoalStatus(Enum):
+# Process-local goal id sequence; cheaper than uuid4 and unique within a run
+_goal_counter = itertools.count()
+
+
+def _gen_goal_id() -> str:
+    """Generate a goal id (UUID4 only when ids must be globally unique)"""
+    if config.uuid_goal_ids:
+        return str(uuid.uuid4())
+    return format(next(_goal_counter), 'x')
+
+
+class GoalStatus(IntEnum):
     """Action goal status"""
     STATUS_UNKNOWN = 0
     STATUS_ACCEPTED = 1
@@ -21,10 +34,10 @@ class GoalStatus(Enum):
     STATUS_ABORTED = 6
 
 
-@dataclass
+@dataclass(slots=True)
 class ActionGoal:
     """Action goal message"""
-    goal_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    goal_id: str = field(default_factory=_gen_goal_id)
     action_type: str = ""
     goal_data: dict = field(default_factory=dict)
     client_node: str = ""
@@ -32,7 +45,7 @@ class ActionGoal:
     timestamp: float = field(default_factory=time.time)
 
 
-@dataclass
+@dataclass(slots=True)
 class ActionGoalStatus:
     """Action goal status message"""
     goal_id: str = ""
@@ -40,7 +53,7 @@ class ActionGoalStatus:
     type: MessageType = MessageType.DATA
 
 
-@dataclass
+@dataclass(slots=True)
 class ActionFeedback:
     """Action feedback message"""
     goal_id: str = ""
@@ -51,7 +64,7 @@ class ActionFeedback:
     timestamp: float = field(default_factory=time.time)
 
 
-@dataclass
+@dataclass(slots=True)
 class ActionResult:
     """Action result message"""
     goal_id: str = ""
@@ -63,14 +76,14 @@ class ActionResult:
     timestamp: float = field(default_factory=time.time)
 
 
-@dataclass
+@dataclass(slots=True)
 class CancelGoalRequest:
     """Request to cancel an action goal"""
     goal_id: str = ""
     type: MessageType = MessageType.SERVICE_REQUEST
 
 
-@dataclass
+@dataclass(slots=True)
 class CancelGoalResponse:
     """Response to cancel goal request"""
     goals_canceling: list = field(default_factory=list)
@@ -79,26 +92,31 @@ class CancelGoalResponse:
 
 # Example action type definitions
 
-@dataclass
+@dataclass(slots=True)
 class NavigateToPoseGoal:
     """Navigate to pose action goal"""
-    goal_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    goal_id: str = field(default_factory=_gen_goal_id)
     action_type: str = "NavigateToPose"
     pose_x: float = 0.0
     pose_y: float = 0.0
     pose_theta: float = 0.0
     max_velocity: float = 1.0
+    _goal_data: Optional[dict] = field(default=None, init=False, repr=False, compare=False)
     type: MessageType = MessageType.ACTION_GOAL
     timestamp: float = field(default_factory=time.time)
     
-    def __post_init__(self):
-        self.goal_data = {
-            "pose": {"x": self.pose_x, "y": self.pose_y, "theta": self.pose_theta},
-            "max_velocity": self.max_velocity
-        }
+    @property
+    def goal_data(self) -> dict:
+        """Goal payload dict, built on first access"""
+        if self._goal_data is None:
+            self._goal_data = {
+                "pose": {"x": self.pose_x, "y": self.pose_y, "theta": self.pose_theta},
+                "max_velocity": self.max_velocity
+            }
+        return self._goal_data
 
 
-@dataclass
+@dataclass(slots=True)
 class NavigateToPoseFeedback:
     """Navigate to pose action feedback"""
     goal_id: str = ""
@@ -107,23 +125,30 @@ class NavigateToPoseFeedback:
     current_pose_y: float = 0.0
     distance_remaining: float = 0.0
     estimated_time_remaining: float = 0.0
+    _feedback_data: Optional[dict] = field(default=None, init=False, repr=False, compare=False)
     progress_percent: float = 0.0
     type: MessageType = MessageType.ACTION_FEEDBACK
     timestamp: float = field(default_factory=time.time)
     
     def __post_init__(self):
-        self.feedback_data = {
-            "current_pose": {"x": self.current_pose_x, "y": self.current_pose_y},
-            "distance_remaining": self.distance_remaining,
-            "estimated_time_remaining": self.estimated_time_remaining
-        }
         if self.distance_remaining > 0:
             self.progress_percent = max(0, 100 - self.distance_remaining * 10)
         else:
             self.progress_percent = 100.0
+    
+    @property
+    def feedback_data(self) -> dict:
+        """Feedback payload dict, built on first access"""
+        if self._feedback_data is None:
+            self._feedback_data = {
+                "current_pose": {"x": self.current_pose_x, "y": self.current_pose_y},
+                "distance_remaining": self.distance_remaining,
+                "estimated_time_remaining": self.estimated_time_remaining
+            }
+        return self._feedback_data
 
 
-@dataclass
+@dataclass(slots=True)
 class NavigateToPoseResult:
     """Navigate to pose action result"""
     goal_id: str = ""
@@ -133,23 +158,27 @@ class NavigateToPoseResult:
     final_pose_y: float = 0.0
     final_pose_theta: float = 0.0
     total_elapsed_time: float = 0.0
-    result_data: dict = field(default_factory=dict)
+    _result_data: Optional[dict] = field(default=None, init=False, repr=False, compare=False)
     error_message: str = ""
     type: MessageType = MessageType.ACTION_RESULT
     timestamp: float = field(default_factory=time.time)
     
-    def __post_init__(self):
-        self.result_data = {
-            "final_pose": {
-                "x": self.final_pose_x,
-                "y": self.final_pose_y,
-                "theta": self.final_pose_theta
-            },
-            "total_elapsed_time": self.total_elapsed_time
-        }
+    @property
+    def result_data(self) -> dict:
+        """Result payload dict, built on first access"""
+        if self._result_data is None:
+            self._result_data = {
+                "final_pose": {
+                    "x": self.final_pose_x,
+                    "y": self.final_pose_y,
+                    "theta": self.final_pose_theta
+                },
+                "total_elapsed_time": self.total_elapsed_time
+            }
+        return self._result_data
 
 
-@dataclass
+@dataclass(slots=True)
 class GoalStatusMessage:
     """Action goal status message"""
     goal_id: str = ""
@@ -157,22 +186,22 @@ class GoalStatusMessage:
     type: MessageType = MessageType.DATA
 
 
-@dataclass
+@dataclass(slots=True)
 class GoalStatusArray:
     """Array of goal statuses"""
     status_list: List[GoalStatusMessage] = field(default_factory=list)
     type: MessageType = MessageType.DATA
 
 
-@dataclass
+@dataclass(slots=True)
 class SendGoalRequest:
     """Request to send a goal"""
-    goal_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    goal_id: str = field(default_factory=_gen_goal_id)
     goal: Any = None
     type: MessageType = MessageType.SERVICE_REQUEST
 
 
-@dataclass
+@dataclass(slots=True)
 class SendGoalResponse:
     """Response to send goal request"""
     accepted: bool = False
@@ -180,14 +209,14 @@ class SendGoalResponse:
     type: MessageType = MessageType.SERVICE_RESPONSE
 
 
-@dataclass
+@dataclass(slots=True)
 class GetResultRequest:
     """Request to get action result"""
     goal_id: str = ""
     type: MessageType = MessageType.SERVICE_REQUEST
 
 
-@dataclass
+@dataclass(slots=True)
 class GetResultResponse:
     """Response with action result"""
     status: GoalStatus = GoalStatus.STATUS_UNKNOWN
@@ -195,30 +224,34 @@ class GetResultResponse:
     type: MessageType = MessageType.SERVICE_RESPONSE
 
 
-@dataclass
+@dataclass(slots=True)
 class NavigateToPoseActionGoal:
     """NavigateToPose action goal"""
-    goal_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    goal_id: str = field(default_factory=_gen_goal_id)
     action_type: str = "NavigateToPose"
     pose_x: float = 0.0
     pose_y: float = 0.0
     pose_theta: float = 0.0
-    goal_data: dict = field(default_factory=dict)
+    _goal_data: Optional[dict] = field(default=None, init=False, repr=False, compare=False)
     client_node: str = ""
     type: MessageType = MessageType.ACTION_GOAL
     timestamp: float = field(default_factory=time.time)
     
-    def __post_init__(self):
-        self.goal_data = {
-            "pose": {
-                "x": self.pose_x,
-                "y": self.pose_y,
-                "theta": self.pose_theta
+    @property
+    def goal_data(self) -> dict:
+        """Goal payload dict, built on first access"""
+        if self._goal_data is None:
+            self._goal_data = {
+                "pose": {
+                    "x": self.pose_x,
+                    "y": self.pose_y,
+                    "theta": self.pose_theta
+                }
             }
-        }
+        return self._goal_data
 
 
-@dataclass
+@dataclass(slots=True)
 class NavigateToPoseActionResult:
     """NavigateToPose action result"""
     goal_id: str = ""
@@ -227,22 +260,26 @@ class NavigateToPoseActionResult:
     final_pose_x: float = 0.0
     final_pose_y: float = 0.0
     final_pose_theta: float = 0.0
-    result_data: dict = field(default_factory=dict)
+    _result_data: Optional[dict] = field(default=None, init=False, repr=False, compare=False)
     error_message: str = ""
     type: MessageType = MessageType.ACTION_RESULT
     timestamp: float = field(default_factory=time.time)
     
-    def __post_init__(self):
-        self.result_data = {
-            "final_pose": {
-                "x": self.final_pose_x,
-                "y": self.final_pose_y,
-                "theta": self.final_pose_theta
+    @property
+    def result_data(self) -> dict:
+        """Result payload dict, built on first access"""
+        if self._result_data is None:
+            self._result_data = {
+                "final_pose": {
+                    "x": self.final_pose_x,
+                    "y": self.final_pose_y,
+                    "theta": self.final_pose_theta
+                }
             }
-        }
+        return self._result_data
 
 
-@dataclass
+@dataclass(slots=True)
 class NavigateToPoseActionFeedback:
     """NavigateToPose action feedback"""
     goal_id: str = ""
@@ -250,65 +287,83 @@ class NavigateToPoseActionFeedback:
     current_pose_x: float = 0.0
     current_pose_y: float = 0.0
     distance_remaining: float = 0.0
-    feedback_data: dict = field(default_factory=dict)
+    _feedback_data: Optional[dict] = field(default=None, init=False, repr=False, compare=False)
     progress_percent: float = 0.0
     type: MessageType = MessageType.ACTION_FEEDBACK
     timestamp: float = field(default_factory=time.time)
     
-    def __post_init__(self):
-        self.feedback_data = {
-            "current_pose": {
-                "x": self.current_pose_x,
-                "y": self.current_pose_y
-            },
-            "distance_remaining": self.distance_remaining
-        }
+    @property
+    def feedback_data(self) -> dict:
+        """Feedback payload dict, built on first access"""
+        if self._feedback_data is None:
+            self._feedback_data = {
+                "current_pose": {
+                    "x": self.current_pose_x,
+                    "y": self.current_pose_y
+                },
+                "distance_remaining": self.distance_remaining
+            }
+        return self._feedback_data
 
 
-@dataclass
+@dataclass(slots=True)
 class FibonacciActionGoal:
     """Fibonacci action goal"""
-    goal_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    goal_id: str = field(default_factory=_gen_goal_id)
     action_type: str = "Fibonacci"
     order: int = 0
-    goal_data: dict = field(default_factory=dict)
+    _goal_data: Optional[dict] = field(default=None, init=False, repr=False, compare=False)
     client_node: str = ""
     type: MessageType = MessageType.ACTION_GOAL
     timestamp: float = field(default_factory=time.time)
     
-    def __post_init__(self):
-        self.goal_data = {"order": self.order}
+    @property
+    def goal_data(self) -> dict:
+        """Goal payload dict, built on first access"""
+        if self._goal_data is None:
+            self._goal_data = {"order": self.order}
+        return self._goal_data
 
 
-@dataclass
+@dataclass(slots=True)
 class FibonacciActionResult:
     """Fibonacci action result"""
     goal_id: str = ""
     action_type: str = "Fibonacci"
     status: GoalStatus = GoalStatus.STATUS_UNKNOWN
     sequence: List[int] = field(default_factory=list)
-    result_data: dict = field(default_factory=dict)
+    _result_data: Optional[dict] = field(default=None, init=False, repr=False, compare=False)
     error_message: str = ""
     type: MessageType = MessageType.ACTION_RESULT
     timestamp: float = field(default_factory=time.time)
     
-    def __post_init__(self):
-        self.result_data = {"sequence": self.sequence}
+    @property
+    def result_data(self) -> dict:
+        """Result payload dict, built on first access"""
+        if self._result_data is None:
+            self._result_data = {"sequence": self.sequence}
+        return self._result_data
 
 
-@dataclass
+@dataclass(slots=True)
 class FibonacciActionFeedback:
     """Fibonacci action feedback"""
     goal_id: str = ""
     action_type: str = "Fibonacci"
     sequence: List[int] = field(default_factory=list)
-    feedback_data: dict = field(default_factory=dict)
+    _feedback_data: Optional[dict] = field(default=None, init=False, repr=False, compare=False)
     progress_percent: float = 0.0
     type: MessageType = MessageType.ACTION_FEEDBACK
     timestamp: float = field(default_factory=time.time)
     
     def __post_init__(self):
-        self.feedback_data = {"sequence": self.sequence}
         # Calculate progress based on sequence length vs expected order
         # For Fibonacci, progress is based on sequence length
         self.progress_percent = min(100.0, len(self.sequence) * 10.0)  # Simple progress calculation
+    
+    @property
+    def feedback_data(self) -> dict:
+        """Feedback payload dict, built on first access"""
+        if self._feedback_data is None:
+            self._feedback_data = {"sequence": self.sequence}
+        return self._feedback_data
@@ -3,47 +3,65 @@ Base message types for ROS2 DEVS simulation.
 """
 
 from dataclasses import dataclass, field
-from typing import Any, Optional, List
+from array import array
+from functools import partial
+import struct
+from typing import Any, Optional, List, Iterator
 import time
 
 from message import MessageType
 
-@dataclass
+
+def pack_float16(values) -> bytes:
+    """Quantize floats to IEEE half precision (2 bytes each).
+    
+    Opt-in for bandwidth modeling: a LaserScan built with
+    ranges=pack_float16(...) is sized at half its float32 payload.
+    """
+    return struct.pack(f'<{len(values)}e', *values)
+
+
+def unpack_float16(data: bytes) -> array:
+    """Expand half-precision bytes from pack_float16 back to a float32 array"""
+    return array('f', struct.unpack(f'<{len(data) // 2}e', data))
+
+
+@dataclass(slots=True)
 class StdMsgsString:
     """std_msgs/String message type"""
     data: str = ""
     type: MessageType = MessageType.DATA
     
 
-@dataclass
+@dataclass(slots=True)
 class StdMsgsInt32:
     """std_msgs/Int32 message type"""
     data: int = 0
     type: MessageType = MessageType.DATA
     
 
-@dataclass
+@dataclass(slots=True)
 class StdMsgsFloat64:
     """std_msgs/Float64 message type"""
     data: float = 0.0
     type: MessageType = MessageType.DATA
     
 
-@dataclass
+@dataclass(slots=True)
 class StdMsgsBool:
     """std_msgs/Bool message type"""
     data: bool = False
     type: MessageType = MessageType.DATA
         
 
-@dataclass
+@dataclass(slots=True)
 class StdMsgsHeader:
     """std_msgs/Header message type"""
     stamp: float = field(default_factory=time.time)
     frame_id: str = ""
     
 
-@dataclass
+@dataclass(slots=True)
 class GeometryMsgsTwist:
     """geometry_msgs/Twist message type"""
     linear_x: float = 0.0
@@ -55,7 +73,7 @@ class GeometryMsgsTwist:
     type: MessageType = MessageType.DATA
         
 
-@dataclass
+@dataclass(slots=True)
 class GeometryMsgsPose:
     """geometry_msgs/Pose message type"""
     position_x: float = 0.0
@@ -68,7 +86,7 @@ class GeometryMsgsPose:
     type: MessageType = MessageType.DATA
         
 
-@dataclass
+@dataclass(slots=True)
 class SensorMsgsLaserScan:
     """sensor_msgs/LaserScan message type"""
     header: StdMsgsHeader = field(default_factory=StdMsgsHeader)
@@ -79,23 +97,23 @@ class SensorMsgsLaserScan:
     scan_time: float = 0.1
     range_min: float = 0.1
     range_max: float = 10.0
-    ranges: List[float] = field(default_factory=list)
-    intensities: List[float] = field(default_factory=list)
+    ranges: array = field(default_factory=partial(array, 'f'))  # float32
+    intensities: array = field(default_factory=partial(array, 'f'))
     type: MessageType = MessageType.DATA
         
 
-@dataclass
+@dataclass(slots=True)
 class SensorMsgsJointState:
     """sensor_msgs/JointState message type"""
     header: StdMsgsHeader = field(default_factory=StdMsgsHeader)
     name: List[str] = field(default_factory=list)
-    position: List[float] = field(default_factory=list)
-    velocity: List[float] = field(default_factory=list)
-    effort: List[float] = field(default_factory=list)
+    position: array = field(default_factory=partial(array, 'd'))  # float64
+    velocity: array = field(default_factory=partial(array, 'd'))
+    effort: array = field(default_factory=partial(array, 'd'))
     type: MessageType = MessageType.DATA
         
 
-@dataclass
+@dataclass(slots=True)
 class NavMsgsOccupancyGrid:
     """nav_msgs/OccupancyGrid message type"""
     header: StdMsgsHeader = field(default_factory=StdMsgsHeader)
@@ -110,5 +128,48 @@ class NavMsgsOccupancyGrid:
     info_origin_orientation_y: float = 0.0
     info_origin_orientation_z: float = 0.0
     info_origin_orientation_w: float = 1.0
-    data: List[int] = field(default_factory=list)
+    data: array = field(default_factory=partial(array, 'b'))  # int8 cells
     type: MessageType = MessageType.DATA
+
+
+class GeometryMsgsTwistBatch:
+    """Structure-of-arrays batch of geometry_msgs/Twist messages.
+    
+    Each field is stored as a contiguous float64 array, so publishers that emit
+    many twists per tick allocate one batch instead of one dataclass per message.
+    """
+    
+    _FIELDS = ('linear_x', 'linear_y', 'linear_z',
+               'angular_x', 'angular_y', 'angular_z')
+    __slots__ = _FIELDS + ('type',)
+    
+    def __init__(self, messages: Optional[List[GeometryMsgsTwist]] = None):
+        for name in self._FIELDS:
+            setattr(self, name, array('d'))
+        self.type = MessageType.DATA
+        if messages:
+            self.extend(messages)
+    
+    def __len__(self) -> int:
+        return len(self.linear_x)
+    
+    def __iter__(self) -> Iterator[GeometryMsgsTwist]:
+        for i in range(len(self)):
+            yield self.view(i)
+    
+    def append(self, msg: GeometryMsgsTwist):
+        """Append a single twist to the batch"""
+        for name in self._FIELDS:
+            getattr(self, name).append(getattr(msg, name))
+    
+    def extend(self, messages: List[GeometryMsgsTwist]):
+        """Append several twists to the batch"""
+        for name in self._FIELDS:
+            getattr(self, name).extend(getattr(msg, name) for msg in messages)
+    
+    def view(self, index: int) -> GeometryMsgsTwist:
+        """Materialize the twist at index as a regular message"""
+        return GeometryMsgsTwist(
+            *(getattr(self, name)[index] for name in self._FIELDS),
+            type=self.type
+        )
@@ -31,6 +31,8 @@ class ExecutorConfig:
     """Executor configuration"""
     spin_period_us: int = 100
     callback_duration_us: int = 10
+    emit_orphan_deliveries: bool = False  # Deliver messages with no local subscriber to the app anyway
+    spin_trace_coalesce: int = 1  # Idle spins per rclcpp_executor_spin_some_batch event (1 = trace every spin)
 
 @dataclass
 class NetworkConfig:
@@ -54,6 +56,8 @@ class SimulationConfig:
     # Communication settings
     enable_parameter_services: bool = True
     enable_diagnostics: bool = True
+    uuid_goal_ids: bool = False  # Use UUID4 action goal ids (goals crossing processes)
+    enable_intra_process: bool = False  # RMW hands messages to same-process subscriptions directly
     
     # Performance settings
     simulation_time_seconds: float = 10.0
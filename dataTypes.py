@@ -90,17 +90,32 @@ class QoSProfile:
     # Partition
     partition: List[str] = field(default_factory=list)
     
+    # Memoized to_rmw_qos() result, cleared whenever a field is reassigned
+    _rmw_cache: Optional['RMWQoSProfile'] = field(default=None, init=False, repr=False, compare=False)
+    
+    def __setattr__(self, name: str, value: Any):
+        object.__setattr__(self, name, value)
+        if name != '_rmw_cache':
+            object.__setattr__(self, '_rmw_cache', None)
+    
     def to_rmw_qos(self) -> 'RMWQoSProfile':
         """Convert to RMW QoS profile"""
         # This would map DDS QoS to RMW QoS
-        return RMWQoSProfile(
-            reliability=self.reliability,
-            durability=self.durability,
-            history=self.history,
-            depth=self.depth,
-            deadline_ms=self.deadline * 1000,
-            lifespan_ms=self.lifespan * 1000
-        )
+        if self._rmw_cache is None:
+            self._rmw_cache = RMWQoSProfile(
+                reliability=self.reliability,
+                durability=self.durability,
+                history=self.history,
+                depth=self.depth,
+                deadline_ms=self.deadline * 1000,
+                lifespan_ms=self.lifespan * 1000
+            )
+        return self._rmw_cache
+    
+    @property
+    def rmw(self) -> 'RMWQoSProfile':
+        """Cached RMW QoS profile"""
+        return self.to_rmw_qos()
 
 
 @dataclass
@@ -191,7 +206,7 @@ class Message:
         self.successfully_delivered = True
 
 
-@dataclass
+@dataclass(slots=True)
 class NodeHandle:
     """RCL node handle"""
     name: str
@@ -200,16 +215,21 @@ class NodeHandle:
     context_handle: int
 
 
-@dataclass
+@dataclass(slots=True)
 class PublisherHandle:
     """RCL publisher handle"""
     node_handle: NodeHandle
     topic: str
     qos_profile: RMWQoSProfile
     handle_id: int
+    node_handle_id: int = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        # Cached for the publish hot path
+        self.node_handle_id = self.node_handle.handle_id
 
 
-@dataclass
+@dataclass(slots=True)
 class SubscriptionHandle:
     """RCL subscription handle"""
     node_handle: NodeHandle
@@ -217,9 +237,13 @@ class SubscriptionHandle:
     qos_profile: RMWQoSProfile
     handle_id: int
     callback: Optional[Callable] = None
+    node_handle_id: int = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        self.node_handle_id = self.node_handle.handle_id
 
 
-@dataclass
+@dataclass(slots=True)
 class TimerHandle:
     """RCL timer handle"""
     node_handle: NodeHandle
@@ -228,7 +252,7 @@ class TimerHandle:
     callback: Optional[Callable] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class ServiceHandle:
     """RCL service handle"""
     node_handle: NodeHandle
@@ -238,7 +262,7 @@ class ServiceHandle:
     callback: Optional[Callable] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class GuardConditionHandle:
     """RCL guard condition handle"""
     handle_id: int
@@ -253,7 +277,7 @@ class ExecutorType(Enum):
     EVENTS = auto()
 
 
-@dataclass
+@dataclass(slots=True)
 class WaitSet:
     """RCL wait set for executor"""
     subscriptions: List[SubscriptionHandle] = field(default_factory=list)
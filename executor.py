@@ -160,17 +160,19 @@ class SingleThreadedExecutor(AtomicDEVS):
         
     def extTransition(self, inputs):
         if self.work_in in inputs:
-            work_item = inputs[self.work_in]
-            if isinstance(work_item, dict):
-                # Convert to WorkItem
-                work = WorkItem(
-                    work_type=work_item.get('type', 'unknown'),
-                    handle=work_item.get('handle', 0),
-                    callback=work_item.get('callback'),
-                    callback_group=work_item.get('callback_group'),
-                    data=work_item.get('message')
-                )
-                self.state['work_queue'].append(work)
+            work_items = inputs[self.work_in]
+            # RCL batches several work items of one step into a list
+            for work_item in (work_items if isinstance(work_items, list) else (work_items,)):
+                if isinstance(work_item, dict):
+                    # Convert to WorkItem
+                    work = WorkItem(
+                        work_type=work_item.get('type', 'unknown'),
+                        handle=work_item.get('handle', 0),
+                        callback=work_item.get('callback'),
+                        callback_group=work_item.get('callback_group'),
+                        data=work_item.get('message')
+                    )
+                    self.state['work_queue'].append(work)
                 
         return self.state
 
@@ -343,17 +345,19 @@ class MultiThreadedExecutor(AtomicDEVS):
         
     def extTransition(self, inputs):
         if self.work_in in inputs:
-            work_item = inputs[self.work_in]
-            if isinstance(work_item, dict):
-                # Convert to WorkItem
-                work = WorkItem(
-                    work_type=work_item.get('type', 'unknown'),
-                    handle=work_item.get('handle', 0),
-                    callback=work_item.get('callback'),
-                    callback_group=work_item.get('callback_group'),
-                    data=work_item.get('message')
-                )
-                self.state['work_queue'].append(work)
+            work_items = inputs[self.work_in]
+            # RCL batches several work items of one step into a list
+            for work_item in (work_items if isinstance(work_items, list) else (work_items,)):
+                if isinstance(work_item, dict):
+                    # Convert to WorkItem
+                    work = WorkItem(
+                        work_type=work_item.get('type', 'unknown'),
+                        handle=work_item.get('handle', 0),
+                        callback=work_item.get('callback'),
+                        callback_group=work_item.get('callback_group'),
+                        data=work_item.get('message')
+                    )
+                    self.state['work_queue'].append(work)
                 
         return self.state
         
@@ -497,26 +501,28 @@ class StaticSingleThreadedExecutor(AtomicDEVS):
         
     def extTransition(self, inputs):
         if self.work_in in inputs:
-            work_item = inputs[self.work_in]
-            if isinstance(work_item, dict):
-                # Store work item by handle
-                handle = work_item.get('handle', 0)
-                
-                work = WorkItem(
-                    work_type=work_item.get('type', 'unknown'),
-                    handle=handle,
-                    callback=work_item.get('callback'),
-                    callback_group=work_item.get('callback_group'),
-                    data=work_item.get('message')
-                )
-                
-                self.state['work_items'][handle] = work
-                
-                # Check if this violates static order
-                if handle not in self.state['static_work_order']:
-                    self.state['statistics']['order_violations'] += 1
-                    # Add to order if not present
-                    self.state['static_work_order'].append(handle)
+            work_items = inputs[self.work_in]
+            # RCL batches several work items of one step into a list
+            for work_item in (work_items if isinstance(work_items, list) else (work_items,)):
+                if isinstance(work_item, dict):
+                    # Store work item by handle
+                    handle = work_item.get('handle', 0)
+                
+                    work = WorkItem(
+                        work_type=work_item.get('type', 'unknown'),
+                        handle=handle,
+                        callback=work_item.get('callback'),
+                        callback_group=work_item.get('callback_group'),
+                        data=work_item.get('message')
+                    )
+                
+                    self.state['work_items'][handle] = work
+                
+                    # Check if this violates static order
+                    if handle not in self.state['static_work_order']:
+                        self.state['statistics']['order_violations'] += 1
+                        # Add to order if not present
+                        self.state['static_work_order'].append(handle)
                     
         return self.state
         
@@ -9,7 +9,7 @@ import time
 import uuid
 
 
-class MessageType(Enum):
+class MessageType(str, Enum):
     """ROS2 message types"""
     DATA = "data"
     SERVICE_REQUEST = "service_request" 
@@ -299,6 +299,52 @@ class DDSParticipant(AtomicDEVS):
         
         return reader
         
+    def delete_writer(self, writer_guid: str) -> bool:
+        """Delete a DataWriter; returns False if the guid is unknown"""
+        writer = self._remove_local_endpoint('local_writers', writer_guid)
+        if writer is None:
+            return False
+        self.state['sequence_numbers'].pop(writer_guid, None)
+        
+        trace_logger.log_event(
+            "dds_delete_writer",
+            {"writer_guid": writer_guid, "topic": writer.topic_name},
+            self.context_key
+        )
+        
+        # Announce the endpoint change
+        self.state['phase'] = 'discovering'
+        return True
+        
+    def delete_reader(self, reader_guid: str) -> bool:
+        """Delete a DataReader so its callback is no longer invoked"""
+        reader = self._remove_local_endpoint('local_readers', reader_guid)
+        if reader is None:
+            return False
+        
+        trace_logger.log_event(
+            "dds_delete_reader",
+            {"reader_guid": reader_guid, "topic": reader.topic_name},
+            self.context_key
+        )
+        
+        # Announce the endpoint change
+        self.state['phase'] = 'discovering'
+        return True
+        
+    def _remove_local_endpoint(self, table: str, guid: str):
+        """Remove a local writer/reader by guid, with its matches; returns it or None"""
+        endpoints_by_topic = self.state[table]
+        for topic, endpoints in endpoints_by_topic.items():
+            for i, endpoint in enumerate(endpoints):
+                if endpoint.guid == guid:
+                    del endpoints[i]
+                    if not endpoints:
+                        del endpoints_by_topic[topic]
+                    self.state['matched_endpoints'].pop(guid, None)
+                    return endpoint
+        return None
+        
     def write_data(self, writer_guid: str, data: Message):
         """Write data through a DataWriter"""
         # Find writer
@@ -339,6 +385,10 @@ class DDSParticipant(AtomicDEVS):
             )
             return False
             
+    def has_matched_readers(self, writer_guid: str) -> bool:
+        """Whether any remote reader is matched with a local writer"""
+        return bool(self.state['matched_endpoints'].get(writer_guid))
+        
     def _create_discovery_message(self) -> DiscoveryMessage:
         """Create participant discovery message"""
         # Gather all endpoints
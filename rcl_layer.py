@@ -5,27 +5,151 @@ Provides C API-like interface for ROS2 functionality.
 
 from pypdevs.DEVS import AtomicDEVS
 from pypdevs.infinity import INFINITY
-import time
+from collections import deque
 from typing import Dict, List, Optional, Any
-import uuid
+import itertools
+import random
+import sys
 
 from tracing import trace_logger
 from context import context_manager
 from configuration import config
 from dataTypes import NodeHandle, PublisherHandle, SubscriptionHandle, TimerHandle, WaitSet, GuardConditionHandle
+from dataTypes import QoSProfile as CompleteQoSProfile
 from parameter import ParameterServer
 from policies import QoSProfile
 from timer import TimerManager
 
+# First handle issued by an RCL layer
+_HANDLE_BASE = 1000
+
+# Lifecycle control bits per node; nodes start with everything enabled
+_CTRL_PUBLISHERS = 0b01
+_CTRL_TIMERS = 0b10
+_CTRL_DEFAULT = _CTRL_PUBLISHERS | _CTRL_TIMERS
+
+# Handle source for contexts; handles need not be unpredictable, only distinct
+_context_rng = random.Random()
+
+# Shared output for steps that emit nothing; PyPDEVS only reads it, never mutate
+_EMPTY: Dict = {}
+
 class RCLContext:
     """RCL context - represents a ROS2 context"""
     def __init__(self):
-        self.handle = int(uuid.uuid4().int >> 96)  # Generate handle
+        self.handle = _context_rng.getrandbits(32)  # Generate handle
         self.is_initialized = False
         self.nodes: Dict[int, NodeHandle] = {}
         self.domain_id = config.dds.domain_id
         
 
+class DenseHandleMap:
+    """Handle -> object map backed by a list indexed by handle - base.
+    
+    Handles are issued sequentially, so a list gives direct indexing where a
+    dict would hash. Stored values must not be None (None marks a free slot).
+    """
+    __slots__ = ('base', 'slots', '_count')
+    
+    def __init__(self, base: int = _HANDLE_BASE):
+        self.base = base
+        self.slots: List[Any] = []
+        self._count = 0
+        
+    def get(self, handle: int, default: Any = None) -> Any:
+        try:
+            index = handle - self.base
+        except TypeError:
+            return default
+        if 0 <= index < len(self.slots):
+            value = self.slots[index]
+            if value is not None:
+                return value
+        return default
+        
+    def __getitem__(self, handle: int) -> Any:
+        value = self.get(handle)
+        if value is None:
+            raise KeyError(handle)
+        return value
+        
+    def __setitem__(self, handle: int, value: Any):
+        index = handle - self.base
+        if index < 0:
+            raise KeyError(handle)
+        slots = self.slots
+        if index >= len(slots):
+            slots.extend([None] * (index + 1 - len(slots)))
+        if slots[index] is None:
+            self._count += 1
+        slots[index] = value
+        
+    def __delitem__(self, handle: int):
+        if self.get(handle) is None:
+            raise KeyError(handle)
+        self.slots[handle - self.base] = None
+        self._count -= 1
+        
+    def __contains__(self, handle: int) -> bool:
+        return self.get(handle) is not None
+        
+    def __len__(self) -> int:
+        return self._count
+        
+    def __iter__(self):
+        return (handle for handle, _ in self.items())
+        
+    def items(self):
+        return ((handle, value) for handle, value in enumerate(self.slots, self.base)
+                if value is not None)
+        
+    def values(self):
+        return (value for value in self.slots if value is not None)
+        
+
+class RCLState:
+    """Slotted RCL layer state; item access kept for dict-style callers"""
+    __slots__ = ('phase', 'context', 'nodes', 'publishers', 'subscriptions',
+                 'subs_by_topic', 'subs_by_topic_node', 'timers', 'services',
+                 'pending_operations', 'handle_counter', 'waitset',
+                 'guard_conditions', 'node_controls', 'virtual_now')
+    
+    def __init__(self):
+        self.phase = 'uninitialized'
+        self.context: Optional[RCLContext] = None
+        self.nodes = DenseHandleMap()          # handle -> NodeHandle
+        self.publishers = DenseHandleMap()     # handle -> PublisherHandle
+        self.subscriptions = DenseHandleMap()  # handle -> SubscriptionHandle
+        self.subs_by_topic: Dict[str, List] = {}        # topic -> [(handle, SubscriptionHandle)]
+        self.subs_by_topic_node: Dict[tuple, List] = {}  # (topic, node handle) -> [(handle, SubscriptionHandle)]
+        self.timers = DenseHandleMap()         # handle -> TimerHandle
+        self.services: Dict[int, Any] = {}
+        self.pending_operations = deque()
+        self.handle_counter = _HANDLE_BASE
+        self.waitset = WaitSet()
+        self.guard_conditions: Dict[int, GuardConditionHandle] = {}
+        self.node_controls: List[int] = []  # node handle - _HANDLE_BASE -> _CTRL_* bits
+        self.virtual_now = 0.0  # Simulated time, advanced in transitions
+        
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+        
+    def __setitem__(self, key: str, value: Any):
+        try:
+            setattr(self, key, value)
+        except AttributeError:
+            raise KeyError(key) from None
+        
+    def __contains__(self, key: str) -> bool:
+        return key in self.__slots__
+        
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
+        
+
 class RCLLayer(AtomicDEVS):
     """
     RCL Layer - Provides core ROS2 functionality.
@@ -36,18 +160,23 @@ class RCLLayer(AtomicDEVS):
         AtomicDEVS.__init__(self, name)
         
         # State
-        self.state = {
-            'phase': 'uninitialized',
-            'context': None,
-            'nodes': {},           # handle -> NodeHandle
-            'publishers': {},      # handle -> PublisherHandle
-            'subscriptions': {},   # handle -> SubscriptionHandle
-            'timers': {},         # handle -> TimerHandle
-            'services': {},       # handle -> ServiceHandle
-            'pending_operations': [],
-            'handle_counter': 1000,
-            'waitset': WaitSet(),
-            'guard_conditions': {}
+        self.state = self._s = RCLState()
+        self._handle_iter = itertools.count(self._s.handle_counter)
+        
+        # Phase-specific timeAdvance/outputFnc, swapped once the context is active
+        self._ta_impl = self._ta_init
+        self._output_impl = self._output_init
+        
+        # Operation type -> handler
+        self._op_dispatch = {
+            'create_node': self._create_node,
+            'create_publisher': self._create_publisher,
+            'create_subscription': self._create_subscription,
+            'create_timer': self._create_timer,
+            'publish': self._publish_message,
+            'deliver_message': self._deliver_message,
+            'create_guard_condition': self._create_guard_condition,
+            'trigger_guard_condition': self._trigger_guard_condition
         }
         
         # Components
@@ -68,6 +197,14 @@ class RCLLayer(AtomicDEVS):
         # Lifecycle control port
         self.control_in = self.addInPort("control_in")
         
+        # Input port -> handler
+        self._ext_handlers = {
+            self.rclcpp_cmd_in: self._on_rclcpp_command,
+            self.rmw_sub_in: self._on_rmw_data,
+            self.param_request_in: self._handle_parameter_request,
+            self.control_in: self._on_control
+        }
+        
         # Register context
         self.context_key = context_manager.register_component(
             "rcl_layer",
@@ -77,63 +214,80 @@ class RCLLayer(AtomicDEVS):
         
     def _next_handle(self) -> int:
         """Generate next unique handle"""
-        handle = self.state['handle_counter']
-        self.state['handle_counter'] += 1
-        return handle
+        return next(self._handle_iter)
+        
+    def _sync_handle_counter(self):
+        """Refresh state.handle_counter with the next handle to be issued"""
+        handle = next(self._handle_iter)
+        self._handle_iter = itertools.count(handle)
+        self._s.handle_counter = handle
         
     def __lt__(self, other):
         """Compare layers by name for DEVS simulator"""
         return self.name < other.name
         
     def timeAdvance(self):
-        if self.state['phase'] == 'uninitialized':
-            return 0.01
-            
-        elif self.state['pending_operations']:
+        return self._ta_impl()
+        
+    def outputFnc(self):
+        return self._output_impl()
+        
+    def _ta_init(self):
+        """Time advance until the context is initialized"""
+        return 0.01
+        
+    def _ta_active(self):
+        """Time advance once the context is active"""
+        if self._s.pending_operations:
             # Process operations quickly
             return 0.0001
             
         # Check for timer expirations
         next_timer = self.timer_manager.get_next_expiration()
         if next_timer is not None:
-            return max(0, next_timer - time.time())
+            return max(0.0, next_timer - self._s.virtual_now)
             
         return INFINITY
         
-    def outputFnc(self):
-        if self.state['phase'] == 'uninitialized' and not self.state['context']:
-            # Initialize RCL context
-            self.state['context'] = RCLContext()
+    def _output_init(self):
+        """Initialize the RCL context"""
+        if not self._s.context:
+            self._s.context = RCLContext()
             
-            trace_logger.log_event(
-                "rcl_init",
-                {
-                    "context_handle": f"0x{self.state['context'].handle:X}",
-                    "version": "4.1.1"
-                },
-                self.context_key
-            )
-            
-        elif self.state['pending_operations']:
-            op = self.state['pending_operations'][0]
-            return self._process_operation(op)
-            
-        # Check for timer callbacks
-        expired_timers = self.timer_manager.get_expired_timers()
-        if expired_timers:
-            timer_handle = expired_timers[0]
-            if timer_handle in self.state['timers']:
-                timer = self.state['timers'][timer_handle]
-                
+            if trace_logger.enabled_for("rcl_init"):
                 trace_logger.log_event(
-                    "rcl_timer_call",
+                    "rcl_init",
                     {
-                        "timer_handle": f"0x{timer_handle:X}",
-                        "period_ns": timer.period_ns
+                        "context_handle": f"0x{self._s.context.handle:X}",
+                        "version": "4.1.1"
                     },
                     self.context_key
                 )
                 
+        return _EMPTY
+        
+    def _output_active(self):
+        """Emit pending operation results or the next timer callback"""
+        if self._s.pending_operations:
+            return self._drain_operations()
+            
+        # Check for timer callbacks
+        now = self._s.virtual_now + self.timeAdvance()
+        timer_handle = self.timer_manager.peek_expired(now)
+        if timer_handle is not None:
+            timer = self._s.timers.get(timer_handle)
+            if timer is not None:
+                
+                if trace_logger.enabled_for("rcl_timer_call"):
+                    trace_logger.log_event(
+                        "rcl_timer_call",
+                        {
+                            "timer_handle": f"0x{timer_handle:X}",
+                            "period_ns": timer.period_ns
+                        },
+                        self.context_key
+                    )
+                
                 # Send timer callback to rclcpp and executor work item
                 out = {self.rclcpp_data_out: {
                     'type': 'timer_callback',
@@ -148,91 +302,95 @@ class RCLLayer(AtomicDEVS):
                 }
                 return out
                 
-        return {}
+        return _EMPTY
         
     def intTransition(self):
-        if self.state['phase'] == 'uninitialized' and self.state['context']:
-            self.state['context'].is_initialized = True
-            self.state['phase'] = 'active'
+        # Advance simulated time by the delay that scheduled this transition
+        self._s.virtual_now += self.timeAdvance()
+        
+        if self._s.phase == 'uninitialized' and self._s.context:
+            self._s.context.is_initialized = True
+            self._s.phase = 'active'
+            self._ta_impl = self._ta_active
+            self._output_impl = self._output_active
             
-        elif self.state['pending_operations']:
-            self.state['pending_operations'].pop(0)
+        elif self._s.pending_operations:
+            # All queued operations were handled by the last outputFnc
+            self._s.pending_operations.clear()
+            self._sync_handle_counter()
             
-        # Update timer manager
-        self.timer_manager.update()
+        # Reschedule the timer that fired, if any
+        else:
+            self.timer_manager.trigger_next(self._s.virtual_now)
         
-        return self.state
+        # Mutated in place; PyPDEVS assigns the result back to self.state, so
+        # the same object is returned rather than None or a copy
+        return self._s
         
     def extTransition(self, inputs):
-        # Handle RCLCPP commands
-        if self.rclcpp_cmd_in in inputs:
-            cmd = inputs[self.rclcpp_cmd_in]
-            self.state['pending_operations'].append(cmd)
-            
-        # Handle RMW data
-        if self.rmw_sub_in in inputs:
-            msg = inputs[self.rmw_sub_in]
-            # Forward to RCLCPP
-            self.state['pending_operations'].append({
-                'type': 'deliver_message',
-                'message': msg
-            })
-            
-        # Handle parameter requests
-        if self.param_request_in in inputs:
-            param_req = inputs[self.param_request_in]
-            self._handle_parameter_request(param_req)
-            
-        # Handle lifecycle control commands
-        if self.control_in in inputs:
-            ctrl = inputs[self.control_in]
-            if isinstance(ctrl, Dict):
-                target = ctrl.get('target_node')
-                enable_pub = ctrl.get('enable_publishers')
-                enable_tim = ctrl.get('enable_timers')
-                for handle, node in self.state['nodes'].items():
-                    if node.name == target:
-                        nc = self.state['node_controls'].setdefault(handle, {'enable_publishers': True, 'enable_timers': True})
-                        if enable_pub is not None:
-                            nc['enable_publishers'] = bool(enable_pub)
-                        if enable_tim is not None:
-                            nc['enable_timers'] = bool(enable_tim)
-                        break
+        self._s.virtual_now += self.elapsed
+        
+        # Dispatch only the ports that carry input this step
+        handlers = self._ext_handlers
+        for port, value in inputs.items():
+            handler = handlers.get(port)
+            if handler:
+                handler(value)
 
-        return self.state
+        return self._s
+        
+    def _on_rclcpp_command(self, cmd: Dict):
+        """Queue an RCLCPP command"""
+        self._s.pending_operations.append(cmd)
+        
+    def _on_rmw_data(self, msg: Any):
+        """Queue delivery of RMW data to RCLCPP"""
+        self._s.pending_operations.append({
+            'type': 'deliver_message',
+            'message': msg
+        })
+        
+    def _on_control(self, ctrl: Dict):
+        """Apply a lifecycle control command to its target node"""
+        if isinstance(ctrl, Dict):
+            target = ctrl.get('target_node')
+            enable_pub = ctrl.get('enable_publishers')
+            enable_tim = ctrl.get('enable_timers')
+            for handle, node in self._s.nodes.items():
+                if node.name == target:
+                    bits = self._s.node_controls[handle - _HANDLE_BASE]
+                    if enable_pub is not None:
+                        bits = bits | _CTRL_PUBLISHERS if enable_pub else bits & ~_CTRL_PUBLISHERS
+                    if enable_tim is not None:
+                        bits = bits | _CTRL_TIMERS if enable_tim else bits & ~_CTRL_TIMERS
+                    self._s.node_controls[handle - _HANDLE_BASE] = bits
+                    break
+        
+    def _drain_operations(self) -> Dict:
+        """Process every pending operation, merging outputs per port.
+        
+        A port that receives more than one value carries a list of them.
+        """
+        out = {}
+        process = self._process_operation
+        for op in self._s.pending_operations:
+            for port, value in process(op).items():
+                if port not in out:
+                    out[port] = value
+                    continue
+                batch = out[port]
+                if not isinstance(batch, list):
+                    batch = out[port] = [batch]
+                if isinstance(value, list):
+                    batch.extend(value)
+                else:
+                    batch.append(value)
+        return out or _EMPTY
         
     def _process_operation(self, op: Dict) -> Dict:
         """Process an RCL operation"""
-        op_type = op.get('type')
-        
-        if op_type == 'create_node':
-            return self._create_node(op)
-            
-        elif op_type == 'create_publisher':
-            return self._create_publisher(op)
-            
-        elif op_type == 'create_subscription':
-            return self._create_subscription(op)
-            
-        elif op_type == 'create_timer':
-            return self._create_timer(op)
-            
-        elif op_type == 'create_service':
-            return self._create_service(op)
-            
-        elif op_type == 'publish':
-            return self._publish_message(op)
-            
-        elif op_type == 'deliver_message':
-            return self._deliver_message(op)
-        
-        elif op_type == 'create_guard_condition':
-            return self._create_guard_condition(op)
-        
-        elif op_type == 'trigger_guard_condition':
-            return self._trigger_guard_condition(op)
-            
-        return {}
+        handler = self._op_dispatch.get(op.get('type'))
+        return handler(op) if handler else _EMPTY
         
     def _create_node(self, op: Dict) -> Dict:
         """Create RCL node"""
@@ -244,21 +402,24 @@ class RCLLayer(AtomicDEVS):
             name=node_name,
             namespace=namespace,
             handle_id=handle,
-            context_handle=self.state['context'].handle
+            context_handle=self._s.context.handle
         )
         
-        self.state['nodes'][handle] = node
-        self.state['context'].nodes[handle] = node
-        
-        trace_logger.log_event(
-            "rcl_node_init",
-            {
-                "node_handle": f"0x{handle:X}",
-                "node_name": node_name,
-                "namespace": namespace
-            },
-            self.context_key
-        )
+        self._s.nodes[handle] = node
+        self._s.context.nodes[handle] = node
+        controls = self._s.node_controls
+        controls.extend([_CTRL_DEFAULT] * (handle - _HANDLE_BASE + 1 - len(controls)))
+        
+        if trace_logger.enabled_for("rcl_node_init"):
+            trace_logger.log_event(
+                "rcl_node_init",
+                {
+                    "node_handle": f"0x{handle:X}",
+                    "node_name": node_name,
+                    "namespace": namespace
+                },
+                self.context_key
+            )
         
         return {self.rclcpp_data_out: {
             'type': 'node_created',
@@ -269,32 +430,34 @@ class RCLLayer(AtomicDEVS):
     def _create_publisher(self, op: Dict) -> Dict:
         """Create RCL publisher"""
         node_handle = op['node_handle']
-        topic = op['topic']
+        topic = sys.intern(op['topic'])  # Identity-fast compares and index lookups
         qos = op.get('qos', QoSProfile())
         
-        if node_handle not in self.state['nodes']:
-            return {}
+        node = self._s.nodes.get(node_handle)
+        if node is None:
+            return _EMPTY
             
         handle = self._next_handle()
         publisher = PublisherHandle(
-            node_handle=self.state['nodes'][node_handle],
+            node_handle=node,
             topic=topic,
-            qos_profile=qos.to_rmw_qos() if hasattr(qos, 'to_rmw_qos') else qos,
+            qos_profile=qos.rmw if isinstance(qos, CompleteQoSProfile) else qos,
             handle_id=handle
         )
         
-        self.state['publishers'][handle] = publisher
-        
-        trace_logger.log_event(
-            "rcl_publisher_init",
-            {
-                "publisher_handle": f"0x{handle:X}",
-                "node_handle": f"0x{node_handle:X}",
-                "topic_name": topic,
-                "qos": str(qos)
-            },
-            self.context_key
-        )
+        self._s.publishers[handle] = publisher
+        
+        if trace_logger.enabled_for("rcl_publisher_init"):
+            trace_logger.log_event(
+                "rcl_publisher_init",
+                {
+                    "publisher_handle": f"0x{handle:X}",
+                    "node_handle": f"0x{node_handle:X}",
+                    "topic_name": topic,
+                    "qos": str(qos)
+                },
+                self.context_key
+            )
         
         return {self.rclcpp_data_out: {
             'type': 'publisher_created',
@@ -305,36 +468,41 @@ class RCLLayer(AtomicDEVS):
     def _create_subscription(self, op: Dict) -> Dict:
         """Create RCL subscription"""
         node_handle = op['node_handle']
-        topic = op['topic']
+        topic = sys.intern(op['topic'])  # Identity-fast compares and index lookups
         qos = op.get('qos', QoSProfile())
         callback = op.get('callback')
         
-        if node_handle not in self.state['nodes']:
-            return {}
+        node = self._s.nodes.get(node_handle)
+        if node is None:
+            return _EMPTY
             
         handle = self._next_handle()
         subscription = SubscriptionHandle(
-            node_handle=self.state['nodes'][node_handle],
+            node_handle=node,
             topic=topic,
-            qos_profile=qos.to_rmw_qos() if hasattr(qos, 'to_rmw_qos') else qos,
+            qos_profile=qos.rmw if isinstance(qos, CompleteQoSProfile) else qos,
             handle_id=handle,
             callback=callback
         )
         
-        self.state['subscriptions'][handle] = subscription
+        self._s.subscriptions[handle] = subscription
+        entry = (handle, subscription)
+        self._s.subs_by_topic.setdefault(topic, []).append(entry)
+        self._s.subs_by_topic_node.setdefault((topic, node_handle), []).append(entry)
         # Update waitset
-        self.state['waitset'].subscriptions.append(subscription)
-        
-        trace_logger.log_event(
-            "rcl_subscription_init",
-            {
-                "subscription_handle": f"0x{handle:X}",
-                "node_handle": f"0x{node_handle:X}",
-                "topic_name": topic,
-                "qos": str(qos)
-            },
-            self.context_key
-        )
+        self._s.waitset.subscriptions.append(subscription)
+        
+        if trace_logger.enabled_for("rcl_subscription_init"):
+            trace_logger.log_event(
+                "rcl_subscription_init",
+                {
+                    "subscription_handle": f"0x{handle:X}",
+                    "node_handle": f"0x{node_handle:X}",
+                    "topic_name": topic,
+                    "qos": str(qos)
+                },
+                self.context_key
+            )
         
         return {self.rclcpp_data_out: {
             'type': 'subscription_created',
@@ -348,30 +516,32 @@ class RCLLayer(AtomicDEVS):
         period_ns = op['period_ns']
         callback = op.get('callback')
         
-        if node_handle not in self.state['nodes']:
-            return {}
+        node = self._s.nodes.get(node_handle)
+        if node is None:
+            return _EMPTY
             
         handle = self._next_handle()
         timer = TimerHandle(
-            node_handle=self.state['nodes'][node_handle],
+            node_handle=node,
             period_ns=period_ns,
             callback=callback,
             handle_id=handle
         )
         
-        self.state['timers'][handle] = timer
-        self.timer_manager.add_timer(handle, period_ns / 1e9)  # Convert to seconds
+        self._s.timers[handle] = timer
+        self.timer_manager.add_timer(handle, period_ns / 1e9, self._s.virtual_now)  # Convert to seconds
         # Update waitset
-        self.state['waitset'].timers.append(timer)
-        
-        trace_logger.log_event(
-            "rcl_timer_init",
-            {
-                "timer_handle": f"0x{handle:X}",
-                "period_ns": period_ns
-            },
-            self.context_key
-        )
+        self._s.waitset.timers.append(timer)
+        
+        if trace_logger.enabled_for("rcl_timer_init"):
+            trace_logger.log_event(
+                "rcl_timer_init",
+                {
+                    "timer_handle": f"0x{handle:X}",
+                    "period_ns": period_ns
+                },
+                self.context_key
+            )
         
         return {self.rclcpp_data_out: {
             'type': 'timer_created',
@@ -383,47 +553,47 @@ class RCLLayer(AtomicDEVS):
         publisher_handle = op['publisher_handle']
         message = op['message']
         
-        if publisher_handle not in self.state['publishers']:
-            return {}
+        publisher = self._s.publishers.get(publisher_handle)
+        if publisher is None:
+            return _EMPTY
             
-        publisher = self.state['publishers'][publisher_handle]
+        node_handle_id = publisher.node_handle_id
+        topic = publisher.topic
         
         # Set message metadata
-        message.topic = publisher.topic
-        
-        trace_logger.log_event(
-            "rcl_publish",
-            {
-                "message_id": message.id,
-                "publisher_handle": f"0x{publisher_handle:X}",
-                "node_handle": f"0x{publisher.node_handle.handle_id:X}"
-            },
-            self.context_key
-        )
+        message.topic = topic
+        
+        if trace_logger.enabled_for("rcl_publish"):
+            trace_logger.log_event(
+                "rcl_publish",
+                {
+                    "message_id": message.id,
+                    "publisher_handle": f"0x{publisher_handle:X}",
+                    "node_handle": f"0x{node_handle_id:X}"
+                },
+                self.context_key
+            )
         
         # Respect lifecycle control: publishers enabled?
-        node_handle_id = publisher.node_handle.handle_id
-        controls = self.state.get('node_controls', {}).get(node_handle_id, {'enable_publishers': True, 'enable_timers': True})
-        if not controls.get('enable_publishers', True):
-            return {}
+        if not self._s.node_controls[node_handle_id - _HANDLE_BASE] & _CTRL_PUBLISHERS:
+            return _EMPTY
 
         # Intra-process communication optimization: deliver to all co-located subs
-        intra_outputs = []
-        for sub_handle, sub in self.state['subscriptions'].items():
-            if hasattr(sub, 'topic') and sub.topic == message.topic and getattr(sub.node_handle, 'handle_id', None) == node_handle_id:
-                trace_logger.log_event(
-                    "rclcpp_take",
-                    {"message_id": message.id, "topic": message.topic, "intra_process": 1},
-                    self.context_key
-                )
-                intra_outputs.append({
-                    'type': 'message_delivery',
-                    'subscription_handle': sub_handle,
-                    'message': message
-                })
-        if intra_outputs:
-            # If multiple, emit the first now; in a full DEVS wiring you'd fan-out via couplings
-            return {self.rclcpp_data_out: intra_outputs[0]}
+        local_subs = self._s.subs_by_topic_node.get((topic, node_handle_id))
+        if local_subs:
+            if trace_logger.enabled_for("rclcpp_take"):
+                for _ in local_subs:
+                    trace_logger.log_event(
+                        "rclcpp_take",
+                        {"message_id": message.id, "topic": topic, "intra_process": 1},
+                        self.context_key
+                    )
+            # One delivery per subscription, emitted together as a list
+            return {self.rclcpp_data_out: [{
+                'type': 'message_delivery',
+                'subscription_handle': sub_handle,
+                'message': message
+            } for sub_handle, _ in local_subs]}
 
         # Otherwise forward to RMW
         return {self.rmw_pub_out: message}
@@ -433,34 +603,34 @@ class RCLLayer(AtomicDEVS):
         message = op['message']
         
         # Find matching subscriptions
-        for sub_handle, subscription in self.state['subscriptions'].items():
-            if subscription.topic == message.topic:
+        for sub_handle, subscription in self._s.subs_by_topic.get(message.topic, ()):
+            if trace_logger.enabled_for("rcl_take"):
                 trace_logger.log_event(
                     "rcl_take",
                     {"message": message.id, "subscription_handle": f"0x{sub_handle:X}"},
                     self.context_key
                 )
+            
+            # Execute callback if present
+            if subscription.callback:
+                subscription.callback(message)
                 
-                # Execute callback if present
-                if subscription.callback:
-                    subscription.callback(message)
-                    
-                out = {self.rclcpp_data_out: {
-                    'type': 'message_delivery',
-                    'subscription_handle': sub_handle,
-                    'message': message
-                }}
-                # Also emit executor work item
-                out[self.exec_work_out] = {
-                    'type': 'subscription',
-                    'handle': sub_handle,
-                    'callback': subscription.callback,
-                    'callback_group': None,
-                    'message': message
-                }
-                return out
-        
-        return {}
+            out = {self.rclcpp_data_out: {
+                'type': 'message_delivery',
+                'subscription_handle': sub_handle,
+                'message': message
+            }}
+            # Also emit executor work item
+            out[self.exec_work_out] = {
+                'type': 'subscription',
+                'handle': sub_handle,
+                'callback': subscription.callback,
+                'callback_group': None,
+                'message': message
+            }
+            return out
+        
+        return _EMPTY
         
     def _handle_parameter_request(self, param_req: Dict):
         """Handle parameter requests"""
@@ -472,13 +642,14 @@ class RCLLayer(AtomicDEVS):
         """Create a guard condition and add to waitset"""
         handle = self._next_handle()
         gc = GuardConditionHandle(handle_id=handle, callback=op.get('callback'))
-        self.state['guard_conditions'][handle] = gc
-        self.state['waitset'].guard_conditions.append(gc)
-        trace_logger.log_event(
-            "rcl_guard_condition_init",
-            {"guard_handle": f"0x{handle:X}"},
-            self.context_key
-        )
+        self._s.guard_conditions[handle] = gc
+        self._s.waitset.guard_conditions.append(gc)
+        if trace_logger.enabled_for("rcl_guard_condition_init"):
+            trace_logger.log_event(
+                "rcl_guard_condition_init",
+                {"guard_handle": f"0x{handle:X}"},
+                self.context_key
+            )
         return {self.rclcpp_data_out: {
             'type': 'guard_condition_created',
             'guard_handle': handle
@@ -487,14 +658,15 @@ class RCLLayer(AtomicDEVS):
     def _trigger_guard_condition(self, op: Dict) -> Dict:
         """Trigger a guard condition -> emit executor work item"""
         handle = op.get('guard_handle')
-        gc = self.state['guard_conditions'].get(handle)
+        gc = self._s.guard_conditions.get(handle)
         if not gc:
-            return {}
-        trace_logger.log_event(
-            "rcl_guard_condition_trigger",
-            {"guard_handle": f"0x{handle:X}"},
-            self.context_key
-        )
+            return _EMPTY
+        if trace_logger.enabled_for("rcl_guard_condition_trigger"):
+            trace_logger.log_event(
+                "rcl_guard_condition_trigger",
+                {"guard_handle": f"0x{handle:X}"},
+                self.context_key
+            )
         return {self.exec_work_out: {
             'type': 'guard_condition',
             'handle': handle,
@@ -5,17 +5,25 @@ Provides C++ client library functionality.
 
 from pypdevs.DEVS import AtomicDEVS
 from pypdevs.infinity import INFINITY
-import time
-from typing import Dict, List, Optional, Any, Callable
+from collections import deque
+from typing import Dict, List, Optional, Any, Callable, Tuple
 from dataclasses import dataclass
-import random
+import sys
 
-from tracing import trace_logger
+from tracing import DictFields, trace_logger
 from context import context_manager
 from configuration import config
 from policies import QoSProfile
 
-@dataclass
+# Constant trace fields, shared by every call (never mutated)
+_EMPTY: Dict[str, Any] = {}
+_RCL_INIT_FIELDS: Dict[str, Any] = {"version": "sim"}
+
+# Fields for per-message events, formatted lazily
+_MESSAGE_FIELDS = DictFields('message_id', 'topic')
+_MESSAGE_ID_FIELDS = DictFields('message_id')
+
+@dataclass(slots=True)
 class PublisherInfo:
     """Information about a publisher"""
     node_name: str = ""
@@ -24,7 +32,7 @@ class PublisherInfo:
     handle: Optional[int] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class SubscriptionInfo:
     """Information about a subscription"""
     node_name: str = ""
@@ -34,7 +42,7 @@ class SubscriptionInfo:
     handle: Optional[int] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class RCLCPPInterface:
     """Interface for RCLCPP layer operations"""
     node_name: str = ""
@@ -45,26 +53,97 @@ class RCLCPPInterface:
     handle: Optional[int] = None
 
 
+class RCLCPPState:
+    """Slotted RCLCPP layer state; item access kept for dict-style callers"""
+    __slots__ = ('phase', 'initialized', 'nodes', 'op_queues', 'executor_active',
+                 'rcl_initialized')
+    
+    def __init__(self):
+        self.phase = 'idle'
+        self.initialized = False
+        self.nodes: Dict[str, Dict] = {}  # node_name -> node_info
+        # op type -> FIFO of pending operations of that type
+        self.op_queues: Dict[str, deque] = {op_type: deque() for op_type in (
+            'deliver_to_app', 'create_node', 'create_publisher',
+            'create_subscription', 'publish', 'publisher_created')}
+        self.executor_active = False
+        self.rcl_initialized = False
+        
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+        
+    def __setitem__(self, key: str, value: Any):
+        try:
+            setattr(self, key, value)
+        except AttributeError:
+            raise KeyError(key) from None
+        
+    def __contains__(self, key: str) -> bool:
+        return key in self.__slots__
+        
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
+        
+
 class RCLCPPLayer(AtomicDEVS):
     """
     RCLCPP Layer - C++ client library interface.
     Manages high-level ROS2 operations.
+    
+    Input ports carry operation dicts with a 'type' key; rcl_data_in and
+    exec_work_in may carry a list of them when RCL batches a step's outputs.
     """
     
     def __init__(self, name: str = "RCLCPPLayer"):
         AtomicDEVS.__init__(self, name)
         
         # State
-        self.state = {
-            'phase': 'idle',
-            'initialized': False,
-            'nodes': {},  # node_name -> node_info
-            'pending_operations': [],
-            'executor_active': False,
-            'pending_publishers': [],  # Publishers waiting for node handle
-            'pending_subscriptions': [],  # Subscriptions waiting for node handle
-            'rcl_initialized': False
+        self.state = self._s = RCLCPPState()
+        
+        # op type -> output handler, in service order: deliveries first,
+        # then creation and publish
+        self._op_dispatch: Dict[str, Optional[Callable[[Dict], Dict]]] = {
+            'deliver_to_app': self._deliver_to_app,
+            'create_node': self._create_node,
+            'create_publisher': self._create_publisher,
+            'create_subscription': self._create_subscription,
+            'publish': self._publish,
+            'publisher_created': None  # Consumed without output
         }
+        queues = self._s.op_queues
+        self._op_order = [(queues[op_type], handler)
+                          for op_type, handler in self._op_dispatch.items()]
+        
+        # RCL data type -> handler
+        self._rcl_data_dispatch: Dict[str, Callable[[Dict], None]] = {
+            'node_created': self._on_node_created,
+            'publisher_created': self._on_publisher_created,
+            'message_delivery': self._on_message_delivery
+        }
+        self._pending = 0          # Total queued operations across all queues
+        self._last_queue = None    # Queue whose head the last outputFnc emitted
+        
+        # Executor spin period in seconds, read once instead of every tick
+        self._spin_period_s = config.executor.spin_period_us / 1e6
+        
+        # Idle spins traced as one batch event every _spin_coalesce_n spins
+        self._spin_coalesce_n = config.executor.spin_trace_coalesce
+        self._idle_spin_count = 0
+        
+        # handle -> "0x..." string for trace fields; handles are a small fixed set
+        self._hex_cache: Dict[int, str] = {}
+        
+        # Constant init-event fields, built once per node/topic and shared
+        # by every trace record (never mutated)
+        self._node_init_fields: Dict[str, Tuple[Dict[str, Any], Dict[str, Any]]] = {}
+        self._topic_init_fields: Dict[str, Dict[str, Any]] = {}
+        
+        # topic -> names of nodes publishing/subscribing it, in creation order
+        self._pubs_by_topic: Dict[str, List[str]] = {}
+        self._subs_by_topic: Dict[str, List[str]] = {}
         
         # Ports - Application interface
         self.app_pub_in = self.addInPort("app_pub_in")
@@ -93,66 +172,75 @@ class RCLCPPLayer(AtomicDEVS):
         return self.name < other.name
         
     def timeAdvance(self):
-        if self.state['phase'] == 'idle' and not self.state['initialized']:
+        s = self._s
+        if not s.initialized and s.phase == 'idle':
             return 0.01
             
-        elif self.state['pending_operations']:
+        elif self._pending:
             # Process operations with minimal delay
             return 0.0001
             
-        elif self.state['executor_active']:
+        elif s.executor_active:
             # Executor spin period
-            return config.executor.spin_period_us / 1e6
+            return self._spin_period_s
             
         return INFINITY
         
     def outputFnc(self):
-        if self.state['phase'] == 'idle' and not self.state['initialized']:
-            trace_logger.log_event("rclcpp_init", {}, self.context_key)
-            if not self.state['rcl_initialized']:
-                trace_logger.log_event("rcl_init", {"version": "sim"}, self.context_key)
-                self.state['rcl_initialized'] = True
-            
-        elif self.state['pending_operations']:
-            op = self.state['pending_operations'][0]
+        s = self._s
+        if not s.initialized and s.phase == 'idle':
+            if trace_logger.enabled_for("rclcpp_init"):
+                trace_logger.log_event("rclcpp_init", _EMPTY, self.context_key)
+            if not s.rcl_initialized:
+                if trace_logger.enabled_for("rcl_init"):
+                    trace_logger.log_event("rcl_init", _RCL_INIT_FIELDS, self.context_key)
+                s.rcl_initialized = True
             
-            # Process based on operation type
-            if op['type'] == 'create_node':
-                return self._create_node(op)
-                
-            elif op['type'] == 'create_publisher':
-                # Create publisher immediately; create node record on demand
-                return self._create_publisher(op)
-                
-            elif op['type'] == 'create_subscription':
-                # Create subscription immediately; create node record on demand
-                return self._create_subscription(op)
+        elif self._pending:
+            if self._idle_spin_count:
+                self._flush_idle_spins()
+            # Serve the first non-empty ready queue; publishers and
+            # subscriptions create their node record on demand
+            for queue, handler in self._op_order:
+                if queue:
+                    self._last_queue = queue
+                    return handler(queue[0]) if handler else {}
                 
-            elif op['type'] == 'publish':
-                return self._publish(op)
-                
-        elif self.state['executor_active']:
-            # Drive pending app deliveries (deliver_to_app operations)
-            for i in range(len(self.state['pending_operations'])):
-                if self.state['pending_operations'][i].get('type') == 'deliver_to_app':
-                    msg = self.state['pending_operations'][i]['message']
-                    return {self.app_sub_out: msg}
-            # Otherwise emit spin event
+        elif s.executor_active:
+            # Emit spin event
+            if self._spin_coalesce_n > 1:
+                self._idle_spin_count += 1
+                if self._idle_spin_count >= self._spin_coalesce_n:
+                    self._flush_idle_spins()
+            elif trace_logger.enabled_for("rclcpp_executor_spin_some"):
+                trace_logger.log_event(
+                    "rclcpp_executor_spin_some",
+                    {"nodes": len(s.nodes)},
+                    self.context_key
+                )
+            
+        return {}
+        
+    def _flush_idle_spins(self):
+        """Trace the idle spins counted since the last flush as one event"""
+        spins = self._idle_spin_count
+        self._idle_spin_count = 0
+        if trace_logger.enabled_for("rclcpp_executor_spin_some_batch"):
             trace_logger.log_event(
-                "rclcpp_executor_spin_some",
-                {"nodes": len(self.state['nodes'])},
+                "rclcpp_executor_spin_some_batch",
+                {"nodes": len(self._s.nodes), "spins_coalesced": spins},
                 self.context_key
             )
-            
-        return {}
         
     def intTransition(self):
-        if self.state['phase'] == 'idle' and not self.state['initialized']:
-            self.state['initialized'] = True
-            self.state['executor_active'] = True
+        s = self._s
+        if not s.initialized and s.phase == 'idle':
+            s.initialized = True
+            s.executor_active = True
             
-        elif self.state['pending_operations']:
-            self.state['pending_operations'].pop(0)
+        elif self._pending:
+            self._last_queue.popleft()
+            self._pending -= 1
             
         return self.state
         
@@ -160,22 +248,26 @@ class RCLCPPLayer(AtomicDEVS):
         # Handle application publisher input
         if self.app_pub_in in inputs:
             app_msg = inputs[self.app_pub_in]
-            if isinstance(app_msg, dict):
-                # Auto-resolve publisher_handle for publish ops if missing
-                if app_msg.get('type') == 'publish' and not app_msg.get('publisher_handle'):
-                    node_name = app_msg.get('node_name')
-                    topic = getattr(app_msg.get('message'), 'topic', None) or app_msg.get('topic')
-                    if node_name and topic and node_name in self.state['nodes']:
-                        nh = self.state['nodes'][node_name]
-                        pub = nh['publishers'].get(topic)
-                        if pub and pub.get('handle'):
-                            app_msg['publisher_handle'] = pub['handle']
-                self.state['pending_operations'].append(app_msg)
+            # Auto-resolve publisher_handle for publish ops if missing
+            if app_msg.get('type') == 'publish' and not app_msg.get('publisher_handle'):
+                nh = self._s.nodes.get(app_msg.get('node_name'))
+                topic = getattr(app_msg.get('message'), 'topic', None) or app_msg.get('topic')
+                if nh is not None and topic:
+                    pub = nh['publishers'].get(topic)
+                    if pub and pub.get('handle'):
+                        app_msg['publisher_handle'] = pub['handle']
+            self._enqueue(app_msg)
                 
         # Handle RCL data input
         if self.rcl_data_in in inputs:
             rcl_data = inputs[self.rcl_data_in]
-            self._handle_rcl_data(rcl_data)
+            # RCL batches several outputs of one step into a list;
+            # each item goes straight to the handler for its type
+            handlers = self._rcl_data_dispatch
+            for data in (rcl_data if isinstance(rcl_data, list) else (rcl_data,)):
+                handler = handlers.get(data.get('type'))
+                if handler is not None:
+                    handler(data)
             
         # Handle graph events
         if self.graph_event_in in inputs:
@@ -186,19 +278,21 @@ class RCLCPPLayer(AtomicDEVS):
         if self.exec_work_in in inputs:
             work = inputs[self.exec_work_in]
             # For subscription work, forward to app_sub_out immediately (simulate executor delivery)
-            if isinstance(work, dict) and work.get('type') == 'subscription' and work.get('message') is not None:
+            messages = [w.get('message') for w in (work if isinstance(work, list) else (work,))
+                        if w.get('type') == 'subscription' and w.get('message') is not None]
+            if messages:
                 return {
                     'state': self.state,
-                    self.app_sub_out: work.get('message')
+                    self.app_sub_out: messages[0] if len(messages) == 1 else messages
                 }
 
         # Handle executor completion events
         if self.exec_complete_in in inputs:
             result = inputs[self.exec_complete_in]
-            if isinstance(result, dict):
+            if trace_logger.enabled_for("rclcpp_executor_callback_complete"):
                 # Log a completion event for richer tracing
                 fields = {
-                    'handle': f"0x{result.get('handle', 0):X}"
+                    'handle': self._hex(result.get('handle', 0))
                 }
                 if 'message_id' in result:
                     fields['message_id'] = result['message_id']
@@ -210,86 +304,115 @@ class RCLCPPLayer(AtomicDEVS):
             
         return self.state
         
+    def _hex(self, handle: int) -> str:
+        """Hex-format a handle, memoized"""
+        text = self._hex_cache.get(handle)
+        if text is None:
+            if len(self._hex_cache) >= 4096:
+                self._hex_cache.clear()  # Bound memory if handles keep changing
+            text = self._hex_cache[handle] = f"0x{handle:X}"
+        return text
+        
+    def _topic_fields(self, topic: str) -> Dict[str, Any]:
+        """Shared {"topic_name": topic} fields for rcl init events"""
+        fields = self._topic_init_fields.get(topic)
+        if fields is None:
+            fields = self._topic_init_fields[topic] = {"topic_name": topic}
+        return fields
+        
+    def _enqueue(self, op: Dict):
+        """Queue an operation on the ready queue for its type"""
+        op_type = op.get('type')
+        queue = self._s.op_queues.get(op_type)
+        if queue is not None:  # Unknown types have no handler and would emit nothing
+            op['type'] = sys.intern(op_type)
+            queue.append(op)
+            self._pending += 1
+            
+    def _deliver_to_app(self, op: Dict) -> Dict:
+        """Deliver a received message to all of its subscribers at once"""
+        return {self.app_sub_out: op['message']}
+        
     def _create_node(self, op: Dict) -> Dict:
         """Create a node"""
-        node_name = op['node_name']
+        # Interned names make node and topic index lookups identity compares
+        node_name = op['node_name'] = sys.intern(op['node_name'])
         
-        if node_name not in self.state['nodes']:
-            self.state['nodes'][node_name] = {
+        nodes = self._s.nodes
+        if node_name not in nodes:
+            nodes[node_name] = {
                 'publishers': {},
                 'subscriptions': {},
                 'services': {},
                 'timers': {}
             }
             
-        trace_logger.log_event(
-            "rclcpp_node_init",
-            {"node_name": node_name},
-            self.context_key
-        )
+        fields = self._node_init_fields.get(node_name)
+        if fields is None:
+            fields = self._node_init_fields[node_name] = (
+                {"node_name": node_name},
+                {"node_name": node_name, "namespace": "/"}
+            )
+        if trace_logger.enabled_for("rclcpp_node_init"):
+            trace_logger.log_event("rclcpp_node_init", fields[0], self.context_key)
         # Emit rcl node init too for parity
-        trace_logger.log_event(
-            "rcl_node_init",
-            {"node_name": node_name, "namespace": "/"},
-            self.context_key
-        )
+        if trace_logger.enabled_for("rcl_node_init"):
+            trace_logger.log_event("rcl_node_init", fields[1], self.context_key)
         
-        # Forward to RCL
-        return {self.rcl_cmd_out: {
-            'type': 'create_node',
-            'node_name': node_name
-        }}
+        # Forward the operation itself to RCL
+        return {self.rcl_cmd_out: op}
         
     def _create_publisher(self, op: Dict) -> Dict:
         """Create a publisher"""
-        node_name = op['node_name']
-        topic = op['topic']
-        if node_name not in self.state['nodes']:
-            self.state['nodes'][node_name] = {
+        node_name = op['node_name'] = sys.intern(op['node_name'])
+        topic = op['topic'] = sys.intern(op['topic'])
+        nodes = self._s.nodes
+        node_info = nodes.get(node_name)
+        if node_info is None:
+            node_info = nodes[node_name] = {
                 'publishers': {}, 'subscriptions': {}, 'services': {}, 'timers': {}
             }
-        node_info = self.state['nodes'][node_name]
         
         # Register publisher
         node_info['publishers'][topic] = {
             'qos': op.get('qos'),
             'handle': None
         }
+        owners = self._pubs_by_topic.setdefault(topic, [])
+        if node_name not in owners:
+            owners.append(node_name)
         
-        trace_logger.log_event(
-            "rclcpp_publisher_init",
-            {
-                "node_name": node_name,
-                "topic": topic
-            },
-            self.context_key
-        )
+        if trace_logger.enabled_for("rclcpp_publisher_init"):
+            trace_logger.log_event(
+                "rclcpp_publisher_init",
+                {
+                    "node_name": node_name,
+                    "topic": topic
+                },
+                self.context_key
+            )
         # rcl layer publisher init
-        trace_logger.log_event(
-            "rcl_publisher_init",
-            {
-                "topic_name": topic
-            },
-            self.context_key
-        )
+        if trace_logger.enabled_for("rcl_publisher_init"):
+            trace_logger.log_event(
+                "rcl_publisher_init",
+                self._topic_fields(topic),
+                self.context_key
+            )
         
-        # Forward to RCL
-        return {self.rcl_cmd_out: {
-            'type': 'create_publisher',
-            'node_handle': node_info.get('handle'),
-            'topic': topic,
-            'qos': op.get('qos')
-        }}
+        # Forward the operation itself to RCL, resolved to the node handle
+        op['node_handle'] = node_info.get('handle')
+        return {self.rcl_cmd_out: op}
         
     def _create_subscription(self, op: Dict) -> Dict:
         """Create a subscription"""
-        node_name = op['node_name']
-        topic = op['topic']
-        if node_name not in self.state['nodes']:
-            self.state['nodes'][node_name] = {
+        node_name = op['node_name'] = sys.intern(op['node_name'])
+        topic = op['topic'] = sys.intern(op['topic'])
+        nodes = self._s.nodes
+        node_info = nodes.get(node_name)
+        if node_info is None:
+            node_info = nodes[node_name] = {
                 'publishers': {}, 'subscriptions': {}, 'services': {}, 'timers': {}
             }
-        node_info = self.state['nodes'][node_name]
         
         # Register subscription
         node_info['subscriptions'][topic] = {
@@ -297,145 +420,123 @@ class RCLCPPLayer(AtomicDEVS):
             'callback': op.get('callback'),
             'handle': None
         }
+        subscribers = self._subs_by_topic.setdefault(topic, [])
+        if node_name not in subscribers:
+            subscribers.append(node_name)
         
-        trace_logger.log_event(
-            "rclcpp_subscription_init",
-            {
-                "node_name": node_name,
-                "topic": topic
-            },
-            self.context_key
-        )
-        # rclcpp registers callback symbol
-        cb = op.get('callback')
-        if cb is not None:
+        if trace_logger.enabled_for("rclcpp_subscription_init"):
             trace_logger.log_event(
-                "rclcpp_subscription_callback_added",
-                {"topic": topic},
+                "rclcpp_subscription_init",
+                {
+                    "node_name": node_name,
+                    "topic": topic
+                },
                 self.context_key
             )
+        # rclcpp registers callback symbol
+        cb = op.get('callback')
+        if cb is not None:
+            if trace_logger.enabled_for("rclcpp_subscription_callback_added"):
+                trace_logger.log_event(
+                    "rclcpp_subscription_callback_added",
+                    {"topic": topic},
+                    self.context_key
+                )
+            if trace_logger.enabled_for("rclcpp_callback_register"):
+                trace_logger.log_event(
+                    "rclcpp_callback_register",
+                    {"symbol": str(cb)},
+                    self.context_key
+                )
+        # rcl layer subscription init
+        if trace_logger.enabled_for("rcl_subscription_init"):
             trace_logger.log_event(
-                "rclcpp_callback_register",
-                {"symbol": str(cb)},
+                "rcl_subscription_init",
+                self._topic_fields(topic),
                 self.context_key
             )
-        # rcl layer subscription init
-        trace_logger.log_event(
-            "rcl_subscription_init",
-            {"topic_name": topic},
-            self.context_key
-        )
         
-        # Forward to RCL
-        return {self.rcl_cmd_out: {
-            'type': 'create_subscription',
-            'node_handle': node_info.get('handle'),
-            'topic': topic,
-            'qos': op.get('qos'),
-            'callback': op.get('callback')
-        }}
+        # Forward the operation itself to RCL, resolved to the node handle
+        op['node_handle'] = node_info.get('handle')
+        return {self.rcl_cmd_out: op}
         
     def _publish(self, op: Dict) -> Dict:
         """Publish a message"""
         message = op['message']
-        publisher_handle = op['publisher_handle']
-        
-        trace_logger.log_event(
-            "rclcpp_publish",
-            {
-                "message_id": message.id,
-                "topic": message.topic
-            },
-            self.context_key
-        )
+        enabled_for = trace_logger.enabled_for
+        
+        if enabled_for("rclcpp_publish"):
+            trace_logger.log_event_values(
+                "rclcpp_publish",
+                _MESSAGE_FIELDS,
+                (message.id, message.topic),
+                self.context_key
+            )
         # rcl layer publish
-        trace_logger.log_event(
-            "rcl_publish",
-            {
-                "message_id": message.id
-            },
-            self.context_key
-        )
+        if enabled_for("rcl_publish"):
+            trace_logger.log_event_values(
+                "rcl_publish",
+                _MESSAGE_ID_FIELDS,
+                (message.id,),
+                self.context_key
+            )
         
-        # Forward to RCL
-        return {self.rcl_cmd_out: {
-            'type': 'publish',
-            'publisher_handle': publisher_handle,
-            'message': message
-        }}
-        
-    def _handle_rcl_data(self, data: Dict):
-        """Handle data from RCL layer"""
-        if data.get('type') == 'node_created':
-            # Store node handle
-            node_name = data['node_name']
-            node_handle = data['node_handle']
-            if node_name in self.state['nodes']:
-                self.state['nodes'][node_name]['handle'] = node_handle
-                
-                # Process pending publishers for this node
-                for pub in self.state['pending_publishers'][:]:
-                    if pub['node_name'] == node_name:
-                        self.state['pending_operations'].append(pub)
-                        self.state['pending_publishers'].remove(pub)
-                        
-                # Process pending subscriptions for this node
-                for sub in self.state['pending_subscriptions'][:]:
-                    if sub['node_name'] == node_name:
-                        self.state['pending_operations'].append(sub)
-                        self.state['pending_subscriptions'].remove(sub)
-                        
-        elif data.get('type') == 'publisher_created':
-            # Store publisher handle and forward to application
-            publisher_handle = data['publisher_handle']
-            topic = data['topic']
-            
-            # Find the node that owns this publisher
-            for node_name, node_info in self.state['nodes'].items():
-                if topic in node_info['publishers']:
-                    node_info['publishers'][topic]['handle'] = publisher_handle
-                    # Forward to application
-                    self.state['pending_operations'].append({
-                        'type': 'publisher_created',
-                        'publisher_handle': publisher_handle,
-                        'topic': topic
-                    })
-                    break
-                        
-        elif data.get('type') == 'message_delivery':
-            # Deliver message to application
-            message = data['message']
-            
-            trace_logger.log_event(
+        # Forward the operation itself; it already carries handle and message
+        return {self.rcl_cmd_out: op}
+        
+    def _on_node_created(self, data: Dict):
+        """Store the node handle"""
+        node_info = self._s.nodes.get(data['node_name'])
+        if node_info is not None:
+            node_info['handle'] = data['node_handle']
+                    
+    def _on_publisher_created(self, data: Dict):
+        """Store publisher handle and forward to application"""
+        publisher_handle = data['publisher_handle']
+        topic = data['topic']
+        
+        # Find the node that owns this publisher
+        owners = self._pubs_by_topic.get(topic)
+        if owners:
+            node_info = self._s.nodes[owners[0]]
+            node_info['publishers'][topic]['handle'] = publisher_handle
+            # Forward to application
+            self._enqueue({
+                'type': 'publisher_created',
+                'publisher_handle': publisher_handle,
+                'topic': topic
+            })
+                    
+    def _on_message_delivery(self, data: Dict):
+        """Deliver message to application"""
+        message = data['message']
+        
+        if trace_logger.enabled_for("rclcpp_take"):
+            trace_logger.log_event_values(
                 "rclcpp_take",
-                {"message_id": message.id, "topic": message.topic},
+                _MESSAGE_FIELDS,
+                (message.id, message.topic),
                 self.context_key
             )
-            
-            # Send to application subscriber(s)
-            # Fan-out to all subscribers of this topic
-            delivered = False
-            for node_name, node_info in self.state['nodes'].items():
-                if message.topic in node_info['subscriptions']:
-                    # deliver to application through app_sub_out
-                    self.state['pending_operations'].append({
-                        'type': 'deliver_to_app',
-                        'message': message
-                    })
-                    delivered = True
-            # If no local subscriber in this rclcpp, still emit deliver_to_app once
-            if not delivered:
-                self.state['pending_operations'].append({
-                    'type': 'deliver_to_app', 'message': message
-                })
-            
+        
+        # Send to application subscriber(s): one delivery on app_sub_out
+        # reaches every subscriber of this topic in a single step.
+        # No local subscriber: the take is traced, but only deliver when
+        # configured to, since an orphan delivery costs an extra step
+        if self._subs_by_topic.get(message.topic) or config.executor.emit_orphan_deliveries:
+            self._enqueue({
+                'type': 'deliver_to_app',
+                'message': message
+            })
+        
     def _handle_graph_event(self, event: Dict):
         """Handle graph discovery event"""
-        trace_logger.log_event(
-            "rclcpp_graph_event",
-            {
-                "event_type": event.get('event_type', 'unknown'),
-                "entity": event.get('entity_name', 'unknown')
-            },
-            self.context_key
-        )
\ No newline at end of file
+        if trace_logger.enabled_for("rclcpp_graph_event"):
+            trace_logger.log_event(
+                "rclcpp_graph_event",
+                {
+                    "event_type": event.get('event_type', 'unknown'),
+                    "entity": event.get('entity_name', 'unknown')
+                },
+                self.context_key
+            )
\ No newline at end of file
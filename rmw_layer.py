@@ -5,22 +5,148 @@ Interfaces between RCL and DDS layers.
 
 from pypdevs.DEVS import AtomicDEVS, CoupledDEVS
 from pypdevs.infinity import INFINITY
-import random
+import sys
 import time
-from typing import Dict, List, Optional, Set, Tuple, Any
+from typing import Any, Callable, Dict, Optional, Set, Tuple
 from dataclasses import dataclass
-import uuid
+from collections import deque
+from functools import lru_cache
+from itertools import islice
 from dataTypes import Message, QoSDurabilityPolicy, QoSReliabilityPolicy, RMWQoSProfile, QoSHistoryPolicy
 from policies import QoSProfile as DDSQoSProfile, QoSReliabilityPolicy as DDSReliability, QoSDurabilityPolicy as DDSDurability, QoSHistoryPolicy as DDSHistory
 from participant import DDSParticipant
 from transport import TransportMultiplexer
-from tracing import trace_logger
+from tracing import DictFields, trace_logger
 from context import context_manager
 from configuration import config
-from transport import TransportMessage, TransportType
+from serialization import type_registry
 
 
-@dataclass
+# Fields for per-endpoint and per-message events, formatted lazily
+_ENDPOINT_INIT_FIELDS = DictFields('handle', 'topic', 'node')
+_PUBLISH_FIELDS = DictFields('message_id', 'topic', 'size')
+_INTRA_PUBLISH_FIELDS = DictFields('message_id', 'topic', 'size', 'intra_process')
+_TAKE_FIELDS = DictFields('message_id', 'topic')
+
+# RMW (dataTypes) enum value -> DDS (policies) enum
+_REL_MAP = {
+    'RELIABLE': DDSReliability.RELIABLE,
+    'BEST_EFFORT': DDSReliability.BEST_EFFORT,
+}
+_DUR_MAP = {
+    'VOLATILE': DDSDurability.VOLATILE,
+    'TRANSIENT_LOCAL': DDSDurability.TRANSIENT_LOCAL,
+    'TRANSIENT': DDSDurability.TRANSIENT,
+    'PERSISTENT': DDSDurability.PERSISTENT,
+}
+_HIST_MAP = {
+    'KEEP_LAST': DDSHistory.KEEP_LAST,
+    'KEEP_ALL': DDSHistory.KEEP_ALL,
+}
+
+# DDS (policies) enum value -> RMW (dataTypes) enum
+_RMW_REL_MAP = {
+    'reliable': QoSReliabilityPolicy.RELIABLE,
+    'best_effort': QoSReliabilityPolicy.BEST_EFFORT,
+}
+_RMW_DUR_MAP = {
+    'volatile': QoSDurabilityPolicy.VOLATILE,
+    'transient_local': QoSDurabilityPolicy.TRANSIENT_LOCAL,
+    'transient': QoSDurabilityPolicy.TRANSIENT,
+    'persistent': QoSDurabilityPolicy.PERSISTENT,
+}
+_RMW_HIST_MAP = {
+    'keep_last': QoSHistoryPolicy.KEEP_LAST,
+    'keep_all': QoSHistoryPolicy.KEEP_ALL,
+}
+
+# QoS delivery requirement bits: a subscription requests them, a message's
+# QoS offers them; delivery is compatible when no requested bit is missing
+_QOS_REQ_RELIABLE = 1
+_QOS_REQ_DURABLE = 2
+_QOS_RELIABILITY_MISMATCH = "reliability mismatch"
+_QOS_DURABILITY_MISMATCH = "durability mismatch"
+
+
+def _qos_request_mask(qos: RMWQoSProfile) -> int:
+    """Requirement bits a subscription QoS places on delivered messages"""
+    return ((_QOS_REQ_RELIABLE if qos.reliability == QoSReliabilityPolicy.RELIABLE else 0) |
+            (_QOS_REQ_DURABLE if qos.durability == QoSDurabilityPolicy.TRANSIENT_LOCAL else 0))
+
+
+def _qos_offer_mask(reliability: Any, durability: Any) -> int:
+    """Requirement bits satisfied by a message QoS"""
+    return ((_QOS_REQ_RELIABLE if reliability == QoSReliabilityPolicy.RELIABLE else 0) |
+            (0 if durability == QoSDurabilityPolicy.VOLATILE else _QOS_REQ_DURABLE))
+
+
+# Offer bits for every (reliability, durability) enum pair
+_QOS_OFFER_MASKS = {
+    (rel, dur): _qos_offer_mask(rel, dur)
+    for rel in QoSReliabilityPolicy
+    for dur in QoSDurabilityPolicy
+}
+_QOS_OFFER_ALL = -1  # Message without QoS: satisfies every requirement
+
+
+def _message_offer_mask(msg: Message) -> int:
+    """Requirement bits satisfied by a message's QoS (messages may carry none)"""
+    qos = getattr(msg, 'qos_profile', None)
+    if not qos:
+        return _QOS_OFFER_ALL
+    key = (qos.reliability, qos.durability)
+    offered = _QOS_OFFER_MASKS.get(key)
+    return offered if offered is not None else _qos_offer_mask(*key)
+
+
+def _qos_mismatch(required: int, offered: int) -> Optional[str]:
+    """Reason a subscription rejects an offer, or None when compatible"""
+    missing = required & ~offered
+    if not missing:
+        return None
+    return _QOS_RELIABILITY_MISMATCH if missing & _QOS_REQ_RELIABLE else _QOS_DURABILITY_MISMATCH
+
+
+def _enum_value(policy: Any) -> Any:
+    """Enum member value, or the policy as a string for non-enum inputs"""
+    return policy.value if hasattr(policy, 'value') else str(policy)
+
+
+@lru_cache(maxsize=256)
+def _rmw_to_dds_qos(reliability: str, durability: str, history: str, depth: int,
+                    deadline_ms: Optional[float], lifespan_ms: Optional[float]) -> DDSQoSProfile:
+    """DDS QoS for the given RMW QoS fields; shared per field combination, treat as immutable"""
+    # Convert ms (RMW) to ns (DDS policies) where finite
+    deadline_ns = None if deadline_ms in (None, float('inf')) else int(deadline_ms * 1e6)
+    lifespan_ns = None if lifespan_ms in (None, float('inf')) else int(lifespan_ms * 1e6)
+
+    return DDSQoSProfile(
+        reliability=_REL_MAP.get(reliability, DDSReliability.RELIABLE),
+        durability=_DUR_MAP.get(durability, DDSDurability.VOLATILE),
+        history=_HIST_MAP.get(history, DDSHistory.KEEP_LAST),
+        depth=depth,
+        deadline=deadline_ns,
+        lifespan=lifespan_ns,
+        partition=[],
+    )
+
+
+@lru_cache(maxsize=256)
+def _dds_to_rmw_qos(reliability: Optional[str], durability: Optional[str], history: Optional[str],
+                    depth: int, deadline: Optional[int], lifespan: Optional[int]) -> RMWQoSProfile:
+    """RMW QoS for the given DDS QoS fields; shared per field combination, treat as immutable"""
+    # policies QoS uses ns; convert to ms; None means infinite
+    return RMWQoSProfile(
+        reliability=_RMW_REL_MAP.get(reliability, QoSReliabilityPolicy.RELIABLE),
+        durability=_RMW_DUR_MAP.get(durability, QoSDurabilityPolicy.VOLATILE),
+        history=_RMW_HIST_MAP.get(history, QoSHistoryPolicy.KEEP_LAST),
+        depth=depth,
+        deadline_ms=float('inf') if deadline is None else deadline / 1e6,
+        lifespan_ms=float('inf') if lifespan is None else lifespan / 1e6
+    )
+
+
+@dataclass(slots=True)
 class RMWPublisher:
     """RMW publisher implementation"""
     handle: int
@@ -29,9 +155,10 @@ class RMWPublisher:
     qos: RMWQoSProfile
     dds_writer_guid: Optional[str] = None
     node_name: str = ""
+    offer_mask: int = 0  # Requirement bits satisfied by qos, set at creation
 
 
-@dataclass
+@dataclass(slots=True)
 class RMWSubscription:
     """RMW subscription implementation"""
     handle: int
@@ -41,8 +168,42 @@ class RMWSubscription:
     dds_reader_guid: Optional[str] = None
     node_name: str = ""
     callback: Optional[callable] = None
+    qos_mask: int = 0  # Requirement bits from qos, set at creation
 
 
+class RMWState:
+    """Slotted RMW implementation state; item access kept for dict-style callers"""
+    __slots__ = ('phase', 'initialized', 'publishers', 'subscriptions',
+                 'pub_by_topic', 'sub_by_topic', 'pending_operations')
+    
+    def __init__(self):
+        self.phase = 'idle'
+        self.initialized = False
+        self.publishers: Dict[int, RMWPublisher] = {}  # handle -> RMWPublisher
+        self.subscriptions: Dict[int, RMWSubscription] = {}  # handle -> RMWSubscription
+        self.pub_by_topic: Dict[str, Dict[int, RMWPublisher]] = {}  # topic -> {handle: RMWPublisher}, in creation order
+        self.sub_by_topic: Dict[str, Dict[int, RMWSubscription]] = {}  # topic -> {handle: RMWSubscription}, in creation order
+        self.pending_operations: deque = deque()
+        
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+        
+    def __setitem__(self, key: str, value: Any):
+        try:
+            setattr(self, key, value)
+        except AttributeError:
+            raise KeyError(key) from None
+        
+    def __contains__(self, key: str) -> bool:
+        return key in self.__slots__
+        
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
+        
+
 class RMWLayer(CoupledDEVS):
     """
     RMW Layer - Interfaces between RCL and DDS.
@@ -97,19 +258,44 @@ class RMWLayer(CoupledDEVS):
 class RMWImplementation(AtomicDEVS):
     """RMW implementation"""
     
+    MAX_BATCH = 64  # Pending operations processed per internal transition
+    
     def __init__(self, name: str = "RMWImpl"):
         AtomicDEVS.__init__(self, name)
         
         # State
-        self.state = {
-            'phase': 'idle',
-            'initialized': False,
-            'publishers': {},  # handle -> RMWPublisher
-            'subscriptions': {},  # handle -> RMWSubscription
-            'pending_operations': [],
-            'handle_counter': 1000
+        self.state = self._s = RMWState()
+        
+        # timeAdvance result, recomputed at the end of each transition
+        self._ta_cache: float = 0.01
+        
+        # Next endpoint handle to issue
+        self._handle_counter: int = 1000
+        
+        # (topic, offer mask) -> ((subscription, mismatch reason or None), ...)
+        # in creation order; cleared whenever a subscription comes or goes
+        self._fanout_cache: Dict[Tuple[str, int], Tuple[Tuple[RMWSubscription, Optional[str]], ...]] = {}
+        
+        # Operation type -> handler, resolved once per queued operation
+        self._op_dispatch: Dict[str, Callable[[Dict], Dict]] = {
+            'create_publisher': self._create_publisher,
+            'create_subscription': self._create_subscription,
+            'publish': self._publish,
+            'destroy_publisher': self._destroy_publisher,
+            'destroy_subscription': self._destroy_subscription,
         }
         
+        # Number of operations the last outputFnc processed, and its wall time
+        self._batch_len = 0
+        self._batch_now = 0.0
+        
+        # DDS writer GUIDs of local publishers, to drop intra-process loopback
+        self._local_writer_guids: Set[str] = set()
+        
+        # CDR type support for the core Message envelope, resolved once
+        self._default_cdr = type_registry.get_type_support("message/Message")
+        self._serialize = self._default_cdr.serialize if self._default_cdr is not None else None
+        
         # Ports - RCL interface
         self.rcl_pub_in = self.addInPort("rcl_pub_in")
         self.rcl_sub_out = self.addOutPort("rcl_sub_out")
@@ -133,53 +319,84 @@ class RMWImplementation(AtomicDEVS):
         return self.name < other.name
         
     def timeAdvance(self):
-        if self.state['phase'] == 'idle' and not self.state['initialized']:
-            return 0.01
+        return self._ta_cache
+        
+    def _refresh_ta(self):
+        """Recompute the cached time advance from the current state"""
+        if self._s.phase == 'idle' and not self._s.initialized:
+            self._ta_cache = 0.01
             
-        elif self.state['pending_operations']:
+        elif self._s.pending_operations:
             # Process operations with minimal delay
-            return 0.0001
+            self._ta_cache = 0.0001
             
-        return INFINITY
+        else:
+            self._ta_cache = INFINITY
         
     def outputFnc(self):
-        if self.state['phase'] == 'idle' and not self.state['initialized']:
+        if self._s.phase == 'idle' and not self._s.initialized:
             trace_logger.log_event(
                 "rmw_init",
                 {},
                 self.context_key
             )
             
-        elif self.state['pending_operations']:
-            op = self.state['pending_operations'][0]
-            
-            # Process based on operation type
-            if op['type'] == 'create_publisher':
-                return self._create_publisher(op)
-                
-            elif op['type'] == 'create_subscription':
-                return self._create_subscription(op)
-                
-            elif op['type'] == 'publish':
-                return self._publish(op)
+        elif self._s.pending_operations:
+            return self._drain_operations()
                 
         return {}
         
     def intTransition(self):
-        if self.state['phase'] == 'idle' and not self.state['initialized']:
-            self.state['initialized'] = True
+        if self._s.phase == 'idle' and not self._s.initialized:
+            self._s.initialized = True
             
-        elif self.state['pending_operations']:
-            self.state['pending_operations'].pop(0)
+        elif self._s.pending_operations:
+            pending = self._s.pending_operations
+            if self._batch_len >= len(pending):
+                pending.clear()
+            else:
+                for _ in range(self._batch_len):
+                    pending.popleft()
+            self._batch_len = 0
             
+        self._refresh_ta()
         return self.state
         
+    def _drain_operations(self) -> Dict:
+        """Process up to MAX_BATCH pending operations, merging outputs per port.
+        
+        A port that receives more than one value carries a list of them.
+        """
+        out = {}
+        batch = list(islice(self._s.pending_operations, self.MAX_BATCH))
+        self._batch_len = len(batch)
+        self._batch_now = time.time()  # One clock read shared by the whole batch
+        dispatch = self._op_dispatch
+        for op in batch:
+            handler = dispatch.get(op.get('type'))
+            if handler is None:
+                continue
+            for port, value in handler(op).items():
+                if port not in out:
+                    out[port] = value
+                    continue
+                merged = out[port]
+                if not isinstance(merged, list):
+                    merged = out[port] = [merged]
+                if isinstance(value, list):
+                    merged.extend(value)
+                else:
+                    merged.append(value)
+        return out
+        
     def extTransition(self, inputs):
         # Handle RCL commands
         if self.rcl_pub_in in inputs:
             rcl_cmd = inputs[self.rcl_pub_in]
-            if isinstance(rcl_cmd, dict):
-                self.state['pending_operations'].append(rcl_cmd)
+            # RCL batches several outputs of one step into a list
+            for cmd in (rcl_cmd if isinstance(rcl_cmd, list) else (rcl_cmd,)):
+                if isinstance(cmd, dict):
+                    self._s.pending_operations.append(cmd)
                 
         # Handle DDS responses/data
         if self.dds_in in inputs:
@@ -190,6 +407,7 @@ class RMWImplementation(AtomicDEVS):
             else:
                 self._handle_dds_response(dds_msg)
             
+        self._refresh_ta()
         return self.state
         
     def _create_publisher(self, op: Dict) -> Dict:
@@ -199,13 +417,15 @@ class RMWImplementation(AtomicDEVS):
         # Create publisher info
         pub = RMWPublisher(
             handle=handle,
-            topic=op['topic'],
+            topic=sys.intern(op['topic']),
             type_name=op.get('type_name', 'std_msgs/String'),
             qos=self._coerce_to_rmw_qos(op.get('qos')),
             node_name=op.get('node_name', '')
         )
+        pub.offer_mask = _qos_offer_mask(pub.qos.reliability, pub.qos.durability)
         
-        self.state['publishers'][handle] = pub
+        self._s.publishers[handle] = pub
+        self._s.pub_by_topic.setdefault(pub.topic, {})[handle] = pub
         
         # Create DDS writer
         writer = self.dds_participant.create_writer(
@@ -214,23 +434,12 @@ class RMWImplementation(AtomicDEVS):
             self._coerce_to_dds_qos(pub.qos)
         )
         pub.dds_writer_guid = writer.guid
+        self._local_writer_guids.add(writer.guid)
         
-        trace_logger.log_event(
-            "rmw_publisher_init",
-            {
-                "handle": handle,
-                "topic": pub.topic,
-                "node": pub.node_name
-            },
-            self.context_key
-        )
-        trace_logger.log_event(
+        trace_logger.log_event_values(
             "rmw_publisher_init",
-            {
-                "handle": handle,
-                "topic": pub.topic,
-                "node": pub.node_name
-            },
+            _ENDPOINT_INIT_FIELDS,
+            (handle, pub.topic, pub.node_name),
             self.context_key
         )
         
@@ -238,7 +447,8 @@ class RMWImplementation(AtomicDEVS):
         self._generate_graph_event(
             "publisher_created",
             pub.topic,
-            pub.node_name
+            pub.node_name,
+            self._batch_now
         )
         
         return {}
@@ -250,14 +460,17 @@ class RMWImplementation(AtomicDEVS):
         # Create subscription info
         sub = RMWSubscription(
             handle=handle,
-            topic=op['topic'],
+            topic=sys.intern(op['topic']),
             type_name=op.get('type_name', 'std_msgs/String'),
             qos=self._coerce_to_rmw_qos(op.get('qos')),
             node_name=op.get('node_name', ''),
             callback=op.get('callback')
         )
+        sub.qos_mask = _qos_request_mask(sub.qos)
         
-        self.state['subscriptions'][handle] = sub
+        self._s.subscriptions[handle] = sub
+        self._s.sub_by_topic.setdefault(sub.topic, {})[handle] = sub
+        self._fanout_cache.clear()
         
         # Create DDS reader
         reader = self.dds_participant.create_reader(
@@ -268,13 +481,10 @@ class RMWImplementation(AtomicDEVS):
         )
         sub.dds_reader_guid = reader.guid
         
-        trace_logger.log_event(
+        trace_logger.log_event_values(
             "rmw_subscription_init",
-            {
-                "handle": handle,
-                "topic": sub.topic,
-                "node": sub.node_name
-            },
+            _ENDPOINT_INIT_FIELDS,
+            (handle, sub.topic, sub.node_name),
             self.context_key
         )
         
@@ -282,7 +492,8 @@ class RMWImplementation(AtomicDEVS):
         self._generate_graph_event(
             "subscription_created",
             sub.topic,
-            sub.node_name
+            sub.node_name,
+            self._batch_now
         )
         
         return {}
@@ -295,33 +506,46 @@ class RMWImplementation(AtomicDEVS):
         if not pub:
             return {}
 
+        # Intra-process: hand the live message to same-process subscriptions,
+        # and only take the CDR + DDS path if a remote reader is matched.
+        # The publisher's QoS is what this delivery offers.
+        if config.enable_intra_process:
+            fanout = self._fanout(msg.topic, pub.offer_mask)
+            if fanout:
+                for sub, mismatch in fanout:
+                    if mismatch is None:
+                        self._on_dds_data_available(sub, msg)
+                if not self.dds_participant.has_matched_readers(pub.dds_writer_guid):
+                    trace_logger.log_event_values(
+                        "rmw_publish",
+                        _INTRA_PUBLISH_FIELDS,
+                        (msg.id, msg.topic, 0, 1),
+                        self.context_key
+                    )
+                    return {}
+
         # Canonical serialization path: use CDR serializer for payload
         size_bytes = 0
-        try:
-            from serialization import type_registry
+        if self._serialize is not None:
             # Default to core Message type if untyped; serialize the envelope
-            payload = msg
-            cdr = type_registry.get_type_support("message/Message")
-            if cdr is not None:
-                serialized = cdr.serialize(payload)
+            try:
+                serialized = self._serialize(msg)
+            except Exception:
+                # Fall back: retain msg as-is
+                serialized = None
+            if serialized is not None:
                 size_bytes = len(serialized)
                 # Attach serialized bytes for transport layers that care
                 msg.serialized_data = serialized
-        except Exception:
-            # Fall back: retain msg as-is
-            pass
 
         # Instruct DDS participant to write data through the local writer
         if hasattr(self, 'dds_participant') and pub.dds_writer_guid:
             self.dds_participant.write_data(pub.dds_writer_guid, msg)
 
-        trace_logger.log_event(
+        trace_logger.log_event_values(
             "rmw_publish",
-            {
-                "message_id": msg.id,
-                "topic": msg.topic,
-                "size": size_bytes
-            },
+            _PUBLISH_FIELDS,
+            (msg.id, msg.topic, size_bytes),
             self.context_key
         )
 
@@ -329,65 +553,94 @@ class RMWImplementation(AtomicDEVS):
         
     def _find_publisher_for_topic(self, topic: str) -> Optional[RMWPublisher]:
         """Find publisher for topic"""
-        for pub in self.state['publishers'].values():
-            if pub.topic == topic:
-                return pub
-        return None
+        pubs = self._s.pub_by_topic.get(topic)
+        return next(iter(pubs.values())) if pubs else None
+        
+    def _destroy_publisher(self, op: Dict) -> Dict:
+        """Destroy publisher"""
+        self.destroy_publisher(op['publisher_handle'])
+        return {}
+        
+    def _destroy_subscription(self, op: Dict) -> Dict:
+        """Destroy subscription"""
+        self.destroy_subscription(op['subscription_handle'])
+        return {}
+        
+    def destroy_publisher(self, handle: int) -> bool:
+        """Remove a publisher, its topic entry and its DDS writer"""
+        pub = self._s.publishers.pop(handle, None)
+        if pub is None:
+            return False
+        topic_pubs = self._s.pub_by_topic[pub.topic]
+        del topic_pubs[handle]
+        if not topic_pubs:
+            del self._s.pub_by_topic[pub.topic]
+        if pub.dds_writer_guid:
+            self._local_writer_guids.discard(pub.dds_writer_guid)
+            self.dds_participant.delete_writer(pub.dds_writer_guid)
+        
+        self._generate_graph_event("publisher_destroyed", pub.topic, pub.node_name)
+        return True
+        
+    def destroy_subscription(self, handle: int) -> bool:
+        """Remove a subscription, its topic entry and its DDS reader"""
+        sub = self._s.subscriptions.pop(handle, None)
+        if sub is None:
+            return False
+        topic_subs = self._s.sub_by_topic[sub.topic]
+        del topic_subs[handle]
+        if not topic_subs:
+            del self._s.sub_by_topic[sub.topic]
+        self._fanout_cache.clear()
+        if sub.dds_reader_guid:
+            # The reader's callback closes over sub; drop it so inbound data stops
+            self.dds_participant.delete_reader(sub.dds_reader_guid)
+        
+        self._generate_graph_event("subscription_destroyed", sub.topic, sub.node_name)
+        return True
         
     def _handle_dds_response(self, response: Dict):
         """Handle response from DDS layer"""
         if response.get('type') == 'data':
             # Find matching subscription
             topic = response.get('topic')
-            for sub in self.state['subscriptions'].values():
-                if sub.topic == topic:
-                    # Check QoS compatibility
-                    msg = response['message']
-                    compatible, reason = self._check_qos_delivery(msg, sub)
-                    
-                    if compatible:
-                        # Deliver to subscription
-                        self._on_dds_data_available(sub, msg)
-                    else:
-                        trace_logger.log_event(
-                            "rmw_qos_incompatible",
-                            {
-                                "topic": topic,
-                                "reason": reason
-                            },
-                            self.context_key
-                        )
+            if isinstance(topic, str):
+                topic = sys.intern(topic)
+            msg = response['message']
+            # QoS compatibility per subscription, precomputed for this offer
+            for sub, mismatch in self._fanout(topic, _message_offer_mask(msg)):
+                if mismatch is None:
+                    # Deliver to subscription
+                    self._on_dds_data_available(sub, msg)
+                else:
+                    trace_logger.log_event(
+                        "rmw_qos_incompatible",
+                        {
+                            "topic": topic,
+                            "reason": mismatch
+                        },
+                        self.context_key
+                    )
                         
     def _handle_dds_data(self, dds_msg: Dict):
         """Handle data from DDS layer (participant -> RMW shape)"""
         # Expected shape from DDSParticipant: {'writer_guid', 'sequence_number', 'topic', 'data', 'timestamp'}
         if isinstance(dds_msg, dict) and 'topic' in dds_msg and 'data' in dds_msg:
-            topic = dds_msg['topic']
+            if (config.enable_intra_process and
+                    dds_msg.get('writer_guid') in self._local_writer_guids):
+                return  # Already delivered intra-process at publish time
+            topic = sys.intern(dds_msg['topic'])
             data_msg = dds_msg['data']
             # Deliver to all matching subscriptions on topic
-            for sub in self.state['subscriptions'].values():
-                if sub.topic == topic:
-                    self._on_dds_data_available(sub, data_msg)
+            for sub in self._s.sub_by_topic.get(topic, {}).values():
+                self._on_dds_data_available(sub, data_msg)
                     
     def _on_dds_data_available(self, subscription: RMWSubscription, msg: Message):
         """Handle received DDS data"""
-        trace_logger.log_event(
-            "rmw_take",
-            {
-                "message_id": msg.id,
-                "topic": subscription.topic
-            },
-            self.context_key
-        )
+        take_values = (msg.id, subscription.topic)
+        trace_logger.log_event_values("rmw_take", _TAKE_FIELDS, take_values, self.context_key)
         # rcl_take parity
-        trace_logger.log_event(
-            "rcl_take",
-            {
-                "message_id": msg.id,
-                "topic": subscription.topic
-            },
-            self.context_key
-        )
+        trace_logger.log_event_values("rcl_take", _TAKE_FIELDS, take_values, self.context_key)
         
         # Invoke user subscription callback if provided
         if subscription.callback:
@@ -400,16 +653,6 @@ class RMWImplementation(AtomicDEVS):
                     self.context_key
                 )
 
-        # Emit rcl_take event before RCL mapping for trace parity
-        trace_logger.log_event(
-            "rcl_take",
-            {
-                "message_id": msg.id,
-                "topic": subscription.topic
-            },
-            self.context_key
-        )
-
         # Forward to RCL
         return {self.rcl_sub_out: {
             'type': 'message_delivery',
@@ -417,67 +660,34 @@ class RMWImplementation(AtomicDEVS):
             'message': msg
         }}
         
-    def _check_qos_delivery(self, msg: Message, sub: RMWSubscription) -> Tuple[bool, str]:
-        """Check if message can be delivered based on QoS"""
-        if not msg.qos_profile or not sub.qos:
-            return True, ""
-            
-        # Check reliability
-        if (sub.qos.reliability == QoSReliabilityPolicy.RELIABLE and
-            msg.qos_profile.reliability != QoSReliabilityPolicy.RELIABLE):
-            return False, "reliability mismatch"
-            
-        # Check durability
-        if (sub.qos.durability == QoSDurabilityPolicy.TRANSIENT_LOCAL and
-            msg.qos_profile.durability == QoSDurabilityPolicy.VOLATILE):
-            return False, "durability mismatch"
-            
-        return True, ""
-        
-    def _generate_graph_event(self, event_type: str, topic: str, node_name: str):
+    def _fanout(self, topic: str, offered: int) -> Tuple[Tuple[RMWSubscription, Optional[str]], ...]:
+        """Subscriptions on topic paired with their QoS mismatch reason for an offer"""
+        key = (topic, offered)
+        fanout = self._fanout_cache.get(key)
+        if fanout is None:
+            subs = self._s.sub_by_topic.get(topic)
+            fanout = self._fanout_cache[key] = tuple(
+                (sub, _qos_mismatch(sub.qos_mask, offered)) for sub in subs.values()
+            ) if subs else ()
+        return fanout
+        
+    def _generate_graph_event(self, event_type: str, topic: str, node_name: str,
+                              now: Optional[float] = None):
         """Generate graph discovery event"""
         event = {
             'type': event_type,
             'topic': topic,
             'node': node_name,
-            'timestamp': time.time()
+            'timestamp': time.time() if now is None else now
         }
         return {self.graph_event_out: event}
 
     def _to_dds_qos(self, rmw_qos: RMWQoSProfile) -> DDSQoSProfile:
         """Convert RMW QoS (dataTypes) to DDS QoS (policies)."""
-        # Map enums by value strings
-        rel_value = rmw_qos.reliability.value if hasattr(rmw_qos.reliability, 'value') else str(rmw_qos.reliability)
-        dur_value = rmw_qos.durability.value if hasattr(rmw_qos.durability, 'value') else str(rmw_qos.durability)
-        hist_value = rmw_qos.history.value if hasattr(rmw_qos.history, 'value') else str(rmw_qos.history)
-
-        rel_map = {
-            'RELIABLE': DDSReliability.RELIABLE,
-            'BEST_EFFORT': DDSReliability.BEST_EFFORT,
-        }
-        dur_map = {
-            'VOLATILE': DDSDurability.VOLATILE,
-            'TRANSIENT_LOCAL': DDSDurability.TRANSIENT_LOCAL,
-            'TRANSIENT': DDSDurability.TRANSIENT,
-            'PERSISTENT': DDSDurability.PERSISTENT,
-        }
-        hist_map = {
-            'KEEP_LAST': DDSHistory.KEEP_LAST,
-            'KEEP_ALL': DDSHistory.KEEP_ALL,
-        }
-
-        # Convert ms (RMW) to ns (DDS policies) where finite
-        deadline_ns = None if rmw_qos.deadline_ms in (None, float('inf')) else int(rmw_qos.deadline_ms * 1e6)
-        lifespan_ns = None if rmw_qos.lifespan_ms in (None, float('inf')) else int(rmw_qos.lifespan_ms * 1e6)
-
-        return DDSQoSProfile(
-            reliability=rel_map.get(rel_value, DDSReliability.RELIABLE),
-            durability=dur_map.get(dur_value, DDSDurability.VOLATILE),
-            history=hist_map.get(hist_value, DDSHistory.KEEP_LAST),
-            depth=rmw_qos.depth,
-            deadline=deadline_ns,
-            lifespan=lifespan_ns,
-            partition=[],
+        return _rmw_to_dds_qos(
+            _enum_value(rmw_qos.reliability), _enum_value(rmw_qos.durability),
+            _enum_value(rmw_qos.history), rmw_qos.depth,
+            rmw_qos.deadline_ms, rmw_qos.lifespan_ms
         )
 
     def _coerce_to_dds_qos(self, qos: Any) -> DDSQoSProfile:
@@ -494,58 +704,24 @@ class RMWImplementation(AtomicDEVS):
         if isinstance(qos, RMWQoSProfile):
             return qos
         if isinstance(qos, DDSQoSProfile):
-            # Map policies enums to dataTypes enums
-            rel_map = {
-                'reliable': QoSReliabilityPolicy.RELIABLE,
-                'best_effort': QoSReliabilityPolicy.BEST_EFFORT,
-            }
-            dur_map = {
-                'volatile': QoSDurabilityPolicy.VOLATILE,
-                'transient_local': QoSDurabilityPolicy.TRANSIENT_LOCAL,
-                'transient': QoSDurabilityPolicy.TRANSIENT,
-                'persistent': QoSDurabilityPolicy.PERSISTENT,
-            }
-            history_map = {
-                'keep_last': QoSHistoryPolicy.KEEP_LAST,
-                'keep_all': QoSHistoryPolicy.KEEP_ALL,
-            }
-            reliability = rel_map.get(qos.reliability.value if hasattr(qos.reliability, 'value') else str(qos.reliability), QoSReliabilityPolicy.RELIABLE)
-            durability = dur_map.get(qos.durability.value if hasattr(qos.durability, 'value') else str(qos.durability), QoSDurabilityPolicy.VOLATILE)
-            history = history_map.get(qos.history.value if hasattr(qos.history, 'value') else str(qos.history), QoSHistoryPolicy.KEEP_LAST)
-            depth = getattr(qos, 'depth', 10)
-            # policies QoS uses ns; convert to ms; None means infinite
-            deadline_attr = getattr(qos, 'deadline', None)
-            lifespan_attr = getattr(qos, 'lifespan', None)
-            deadline_ms = float('inf') if (deadline_attr is None) else (deadline_attr / 1e6)
-            lifespan_ms = float('inf') if (lifespan_attr is None) else (lifespan_attr / 1e6)
-            return RMWQoSProfile(
-                reliability=reliability,
-                durability=durability,
-                history=history,
-                depth=depth,
-                deadline_ms=deadline_ms,
-                lifespan_ms=lifespan_ms
+            return _dds_to_rmw_qos(
+                _enum_value(qos.reliability), _enum_value(qos.durability),
+                _enum_value(qos.history), getattr(qos, 'depth', 10),
+                getattr(qos, 'deadline', None), getattr(qos, 'lifespan', None)
             )
         # Fallback default RMW QoS
-        return RMWQoSProfile(
-            reliability=QoSReliabilityPolicy.RELIABLE,
-            durability=QoSDurabilityPolicy.VOLATILE,
-            history=QoSHistoryPolicy.KEEP_LAST,
-            depth=10,
-            deadline_ms=float('inf'),
-            lifespan_ms=float('inf')
-        )
+        return _dds_to_rmw_qos(None, None, None, 10, None, None)
         
     def _next_handle(self) -> int:
         """Generate next handle"""
-        handle = self.state['handle_counter']
-        self.state['handle_counter'] += 1
+        handle = self._handle_counter
+        self._handle_counter = handle + 1
         return handle
         
     def get_publisher_count(self, topic: str) -> int:
         """Get number of publishers for topic"""
-        return sum(1 for p in self.state['publishers'].values() if p.topic == topic)
+        return len(self._s.pub_by_topic.get(topic, ()))
         
     def get_subscription_count(self, topic: str) -> int:
         """Get number of subscriptions for topic"""
-        return sum(1 for s in self.state['subscriptions'].values() if s.topic == topic)
\ No newline at end of file
+        return len(self._s.sub_by_topic.get(topic, ()))
\ No newline at end of file
@@ -5,8 +5,9 @@ Handles message serialization/deserialization.
 
 import struct
 import time
+from array import array
 from typing import Any, Dict, List, Optional, Tuple, Union, Type
-from dataclasses import dataclass, fields, is_dataclass
+from dataclasses import MISSING, dataclass, fields, is_dataclass
 from enum import Enum, IntEnum
 import io
 from message import Message
@@ -26,6 +27,22 @@ class CDREncapsulation(Enum):
     DELIMITED_CDR2_LE = 0x0009  # Delimited CDR2 Little Endian
 
 
+# Per-dataclass serialization plans: cls -> ((field_name, optional, writer), ...)
+_FIELD_PLANS: Dict[type, Tuple[Tuple[str, bool, Any], ...]] = {}
+
+# array typecodes with a CDR primitive of the same struct format (f -> float32, d -> float64, b -> int8, ...)
+_ARRAY_TYPECODES = frozenset('bBhHiIqQfd')
+
+
+def _array_field_typecode(f) -> str:
+    """Typecode of an array-typed dataclass field, taken from its default (float64 if none)"""
+    if f.default_factory is not MISSING:
+        default = f.default_factory()
+        if isinstance(default, array):
+            return default.typecode
+    return 'd'
+
+
 class CDRSerializer:
     """
     CDR serializer for DDS messages.
@@ -144,6 +161,8 @@ class CDRSerializer:
             self._write_string(obj)
         elif isinstance(obj, bytes):
             self._write_sequence(obj, self._write_uint8)
+        elif isinstance(obj, array):
+            self._write_array(obj)
         elif isinstance(obj, (list, tuple)):
             self._write_sequence(obj, self._serialize_object)
         elif isinstance(obj, dict):
@@ -187,21 +206,64 @@ class CDRSerializer:
             raise ValueError(f"Cannot deserialize type {obj_type}")
             
     def _serialize_dataclass(self, obj):
-        """Serialize a dataclass"""
-        for field in fields(obj):
-            value = getattr(obj, field.name)
+        """Serialize a dataclass using its cached field plan"""
+        plan = _FIELD_PLANS.get(type(obj))
+        if plan is None:
+            plan = _FIELD_PLANS[type(obj)] = self._build_field_plan(obj)
+            
+        for name, optional, write in plan:
+            value = getattr(obj, name)
             
             # Handle optional fields
-            if hasattr(field.type, '__origin__') and field.type.__origin__ == Union:
-                # Check if it's Optional (Union with None)
-                if type(None) in field.type.__args__:
-                    if value is None:
-                        self._write_bool(False)  # Not present
-                        continue
-                    else:
-                        self._write_bool(True)  # Present
-                        
-            self._serialize_typed_value(value, field.type)
+            if optional:
+                if value is None:
+                    self._write_bool(False)  # Not present
+                    continue
+                self._write_bool(True)  # Present
+                
+            write(self, value)
+            
+    @staticmethod
+    def _build_field_plan(obj) -> Tuple[Tuple[str, bool, Any], ...]:
+        """Resolve each field's type dispatch once; writers take (serializer, value)"""
+        plan = []
+        for field in fields(obj):
+            field_type = field.type
+            is_union = hasattr(field_type, '__origin__') and field_type.__origin__ == Union
+            optional = is_union and type(None) in field_type.__args__
+            plan.append((field.name, optional, CDRSerializer._typed_writer(field_type)))
+        return tuple(plan)
+        
+    @staticmethod
+    def _typed_writer(field_type: Type):
+        """Writer equivalent to _serialize_typed_value for a fixed field type"""
+        if field_type == bool:
+            return CDRSerializer._write_bool
+        elif field_type == int:
+            return CDRSerializer._write_int32
+        elif field_type == float:
+            return CDRSerializer._write_float64
+        elif field_type == str:
+            return CDRSerializer._write_string
+        elif field_type is array:
+            return CDRSerializer._write_array
+        elif hasattr(field_type, '__origin__'):
+            if field_type.__origin__ == list:
+                elem_type = field_type.__args__[0] if field_type.__args__ else Any
+                return lambda s, value: s._write_sequence(
+                    value, lambda x: s._serialize_typed_value(x, elem_type))
+            elif field_type.__origin__ == dict:
+                return CDRSerializer._serialize_dict
+            return lambda s, value: None  # Other generics (e.g. Optional) carry no payload
+        try:
+            if issubclass(field_type, Enum):
+                return lambda s, value: s._write_int32(value.value)
+        except TypeError:
+            # Not a class (e.g. a string annotation): keep the per-call dispatch
+            return lambda s, value: s._serialize_typed_value(value, field_type)
+        if is_dataclass(field_type):
+            return CDRSerializer._serialize_dataclass
+        return CDRSerializer._serialize_object
             
     def _serialize_typed_value(self, value: Any, field_type: Type):
         """Serialize a value with known type information"""
@@ -213,6 +275,8 @@ class CDRSerializer:
             self._write_float64(value)
         elif field_type == str:
             self._write_string(value)
+        elif field_type is array:
+            self._write_array(value)
         elif hasattr(field_type, '__origin__'):
             if field_type.__origin__ == list:
                 elem_type = field_type.__args__[0] if field_type.__args__ else Any
@@ -239,12 +303,16 @@ class CDRSerializer:
                         values[field.name] = None
                         continue
                         
+            if field.type is array:
+                values[field.name] = self._read_array(_array_field_typecode(field))
+                continue
+                
             values[field.name] = self._deserialize_typed_value(field.type)
             
         return cls(**values)
         
-    def _deserialize_typed_value(self, field_type: Type) -> Any:
-        """Deserialize a value with known type information"""
+    def _deserialize_typed_value(self, field_type: Type, typecode: str = 'd') -> Any:
+        """Deserialize a value with known type information (typecode applies to array)"""
         if field_type == bool:
             return self._read_bool()
         elif field_type == int:
@@ -253,6 +321,8 @@ class CDRSerializer:
             return self._read_float64()
         elif field_type == str:
             return self._read_string()
+        elif field_type is array:
+            return self._read_array(typecode)
         elif hasattr(field_type, '__origin__'):
             if field_type.__origin__ == list:
                 elem_type = field_type.__args__[0] if field_type.__args__ else Any
@@ -356,6 +426,23 @@ class CDRSerializer:
         for item in seq:
             writer_func(item)
             
+    def _write_array(self, values: array):
+        """Write a typed array as a sequence of its element primitive.
+        
+        Elements are contiguous and share one size, so after aligning the
+        first one the whole payload is packed in a single call.
+        """
+        typecode = values.typecode
+        if typecode not in _ARRAY_TYPECODES:
+            raise ValueError(f"Cannot serialize array of typecode {typecode!r}")
+        count = len(values)
+        self._write_uint32(count)
+        if count:
+            size = struct.calcsize(typecode)
+            self._align(size)
+            self._buffer.write(struct.pack(f'{self.endianness}{count}{typecode}', *values))
+            self._offset += count * size
+            
     # Primitive type readers
     def _read_bool(self) -> bool:
         self._align(1)
@@ -439,6 +526,19 @@ class CDRSerializer:
         length = self._read_uint32()
         return [reader_func() for _ in range(length)]
         
+    def _read_array(self, typecode: str) -> array:
+        """Read a sequence written by _write_array into an array of typecode"""
+        if typecode not in _ARRAY_TYPECODES:
+            raise ValueError(f"Cannot deserialize array of typecode {typecode!r}")
+        count = self._read_uint32()
+        if not count:
+            return array(typecode)
+        size = struct.calcsize(typecode)
+        self._align(size)
+        data = self._buffer.read(count * size)
+        self._offset += count * size
+        return array(typecode, struct.unpack(f'{self.endianness}{count}{typecode}', data))
+        
     def _align(self, alignment: int):
         """Align buffer to boundary"""
         current_pos = self._buffer.tell()
@@ -2,11 +2,13 @@
 Timer-related messages for ROS2 DEVS simulation.
 """
 
-from dataclasses import dataclass
+from collections import deque
+from dataclasses import dataclass, field
+import heapq
 import time
-from typing import Dict, List, Optional
+from typing import Deque, Dict, List, Optional, Tuple
 
-from message import Message, MessageType
+from message import Message
 
 
 class Timer:
@@ -18,71 +20,183 @@ class Timer:
         self.period = max(0.001, period)  # Minimum 1ms period
         self.last_trigger_time = time.time()
     
-    def is_ready(self) -> bool:
-        """Check if timer is ready to trigger"""
-        current_time = time.time()
+    def is_ready(self, now: Optional[float] = None) -> bool:
+        """Check if timer is ready to trigger; callers scanning many timers pass one now"""
+        current_time = time.time() if now is None else now
         return current_time >= self.last_trigger_time + self.period
     
-    def trigger(self):
+    def trigger(self, now: Optional[float] = None):
         """Trigger the timer and update last trigger time"""
-        self.last_trigger_time = time.time()
+        self.last_trigger_time = time.time() if now is None else now
     
-    def reset(self):
+    def reset(self, now: Optional[float] = None):
         """Reset timer to current time"""
-        self.last_trigger_time = time.time()
+        self.last_trigger_time = time.time() if now is None else now
     
-    def get_time_until_next(self) -> float:
+    def get_time_until_next(self, now: Optional[float] = None) -> float:
         """Get time until next trigger"""
-        current_time = time.time()
+        current_time = time.time() if now is None else now
         next_trigger = self.last_trigger_time + self.period
         return max(0.0, next_trigger - current_time)
 
 
 class TimerManager:
-    """Manager for multiple timers"""
+    """Manager for multiple timers, scheduled on simulated time.
+    
+    Timers sharing a period live in a FIFO bucket for that period: they are
+    added in time order and rescheduled by the same period, so each bucket
+    stays sorted without heap sifting. Periods beyond MAX_BUCKETS fall back
+    to a min-heap.
+    """
+    
+    MAX_BUCKETS = 16
     
     def __init__(self):
-        self.timers: Dict[int, Timer] = {}
+        self.timers: Dict[int, float] = {}  # timer_id -> period (s)
+        # timer_id -> its live queue entry; any other entry for it is stale
+        self._live: Dict[int, Tuple[float, int]] = {}
+        # period -> FIFO of (deadline, timer_id); stale entries are skipped lazily
+        self._buckets: Dict[float, Deque[Tuple[float, int]]] = {}
+        # Min-heap of (deadline, timer_id) for periods without a bucket
+        self._heap: List[Tuple[float, int]] = []
+        # Memoized _earliest() result; None when a queue changed since
+        self._earliest_cache: Optional[Tuple[Optional[Tuple[float, int]], object]] = None
     
-    def add_timer(self, timer_id: int, period: float):
-        """Add a timer with given ID and period"""
-        self.timers[timer_id] = Timer(period)
+    def add_timer(self, timer_id: int, period: float, now: float = 0.0):
+        """Add a timer with given ID and period, first firing at now + period"""
+        period = max(0.001, period)  # Minimum 1ms period
+        self.timers[timer_id] = period
+        entry = self._live[timer_id] = (now + period, timer_id)
+        bucket = self._buckets.get(period)
+        if bucket is None and len(self._buckets) < self.MAX_BUCKETS:
+            bucket = self._buckets[period] = deque()
+        if bucket is not None:
+            bucket.append(entry)
+            queue = bucket
+        else:
+            heapq.heappush(self._heap, entry)
+            queue = self._heap
+        
+        # Keep the memo unless the new timer becomes the earliest; a re-added
+        # timer may have been the memoized head, so that case rescans
+        cache = self._earliest_cache
+        if cache is not None:
+            best = cache[0]
+            if best is not None and best[1] == timer_id:
+                self._earliest_cache = None
+            elif best is None or entry[0] < best[0]:
+                self._earliest_cache = (entry, queue) if queue[0] is entry else None
     
     def remove_timer(self, timer_id: int):
         """Remove a timer by ID"""
         if timer_id in self.timers:
             del self.timers[timer_id]
+            del self._live[timer_id]
+            cache = self._earliest_cache
+            if cache is not None and cache[0] is not None and cache[0][1] == timer_id:
+                self._earliest_cache = None
     
-    def get_expired_timers(self) -> List[int]:
-        """Get list of expired timer IDs"""
-        expired = []
-        for timer_id, timer in self.timers.items():
-            if timer.is_ready():
-                expired.append(timer_id)
-        return expired
+    def _earliest(self):
+        """Get the earliest live (deadline, timer_id) entry and the queue holding it.
+        
+        The result is memoized until a timer is added, removed or fired, so the
+        per-step timeAdvance/peek/trigger sequence scans the queue heads once.
+        """
+        if self._earliest_cache is not None:
+            return self._earliest_cache
+        live = self._live
+        best = None
+        best_queue = None
+        for bucket in self._buckets.values():
+            while bucket and live.get(bucket[0][1]) is not bucket[0]:
+                bucket.popleft()
+            if bucket and (best is None or bucket[0][0] < best[0]):
+                best = bucket[0]
+                best_queue = bucket
+        
+        heap = self._heap
+        while heap and live.get(heap[0][1]) is not heap[0]:
+            heapq.heappop(heap)
+        if heap and (best is None or heap[0][0] < best[0]):
+            best = heap[0]
+            best_queue = heap
+        self._earliest_cache = (best, best_queue)
+        return self._earliest_cache
     
-    def get_next_expiration(self) -> Optional[float]:
-        """Get time until next timer expiration"""
-        if not self.timers:
+    def peek_expired(self, now: float) -> Optional[int]:
+        """Get the earliest timer ID due at now, without consuming it"""
+        best, _ = self._earliest()
+        if best is not None and best[0] <= now:
+            return best[1]
+        return None
+    
+    def trigger_next(self, now: float) -> Optional[int]:
+        """Pop the earliest due timer and reschedule it one period later"""
+        best, queue = self._earliest()
+        if best is None or best[0] > now:
             return None
         
-        next_time = None
-        for timer in self.timers.values():
-            time_until = timer.get_time_until_next()
-            if next_time is None or time_until < next_time:
-                next_time = time_until
+        deadline, timer_id = best
+        entry = self._live[timer_id] = (deadline + self.timers[timer_id], timer_id)
+        self._earliest_cache = None
+        if queue is self._heap:
+            heapq.heapreplace(queue, entry)
+        else:
+            queue.popleft()
+            queue.append(entry)
+        return timer_id
+    
+    def get_expired_timers(self, now: float) -> List[int]:
+        """Get list of expired timer IDs, rescheduling each of them"""
+        timers = self.timers
+        live = self._live
+        expired = []
+        self._earliest_cache = None
         
-        if next_time is not None:
-            return time.time() + next_time
-        return None
+        # Buckets: rescheduled entries go to the tail, behind every due head,
+        # so one pass bounded by the original length visits each entry once
+        for bucket in self._buckets.values():
+            popleft = bucket.popleft
+            append = bucket.append
+            for _ in range(len(bucket)):
+                entry = bucket[0]
+                deadline, timer_id = entry
+                if deadline > now:
+                    break
+                popleft()
+                if live.get(timer_id) is not entry:
+                    continue  # Removed or re-added timer
+                expired.append(entry)
+                entry = live[timer_id] = (deadline + timers[timer_id], timer_id)
+                append(entry)
+        
+        heap = self._heap
+        heappop = heapq.heappop
+        rescheduled = []
+        while heap and heap[0][0] <= now:
+            entry = heappop(heap)
+            deadline, timer_id = entry
+            if live.get(timer_id) is not entry:
+                continue  # Removed or re-added timer
+            expired.append(entry)
+            entry = live[timer_id] = (deadline + timers[timer_id], timer_id)
+            rescheduled.append(entry)
+        
+        # Push back after draining so each timer is reported once per call
+        for entry in rescheduled:
+            heapq.heappush(heap, entry)
+        
+        expired.sort()
+        return [timer_id for _, timer_id in expired]
+    
+    def get_next_expiration(self) -> Optional[float]:
+        """Get simulated time of the next timer expiration"""
+        best, _ = self._earliest()
+        return best[0] if best is not None else None
     
-    def update(self):
-        """Update all timers"""
-        # This method can be used to trigger expired timers
-        expired = self.get_expired_timers()
-        for timer_id in expired:
-            if timer_id in self.timers:
-                self.timers[timer_id].trigger()
+    def update(self, now: float):
+        """Trigger all expired timers"""
+        self.get_expired_timers(now)
 
 
 @dataclass
@@ -91,12 +205,7 @@ class TimerEvent(Message):
     timer_id: str = ""
     period_ms: float = 0.0
     expected_trigger_time: float = 0.0
-    actual_trigger_time: float = 0.0
-    
-    def __post_init__(self):
-        super().__init__()
-        self.type = MessageType.DATA
-        self.actual_trigger_time = time.time()
+    actual_trigger_time: float = field(default_factory=time.time)
         
     def calculate_jitter_ms(self) -> float:
         """Calculate timer jitter in milliseconds"""
@@ -108,20 +217,16 @@ class TimerEvent(Message):
 @dataclass
 class ClockMessage(Message):
     """ROS2 Clock message for /clock topic"""
+    topic: str = "/clock"
     clock_sec: int = 0
     clock_nanosec: int = 0
-    
-    def __post_init__(self):
-        super().__init__()
-        self.type = MessageType.DATA
-        self.topic = "/clock"
         
     @classmethod
     def from_timestamp(cls, timestamp: float) -> 'ClockMessage':
         """Create clock message from timestamp"""
         sec = int(timestamp)
         nanosec = int((timestamp - sec) * 1e9)
-        return cls(clock_sec=sec, clock_nanosec=nanosec)
+        return cls(header=None, clock_sec=sec, clock_nanosec=nanosec)
         
     def to_timestamp(self) -> float:
         """Convert to timestamp"""
@@ -4,12 +4,15 @@ Matches real ROS2 tracing format while maintaining flexible architecture.
 """
 
 import time
+import atexit
 import json
 import os
 import platform
 import random
+import threading
+from collections import deque
 from dataclasses import dataclass, field
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime
 from enum import Enum
 
@@ -23,17 +26,50 @@ class TraceFormat(Enum):
     JSON = "json"                       # JSON format for analysis
 
 
+class DictFields:
+    """Fields template for log_event_values whose values form a dict.
+    
+    Text output renders the dict repr; JSON output gets a real object.
+    """
+    __slots__ = ('keys', 'template')
+    
+    def __init__(self, *keys: str):
+        self.keys = keys
+        self.template = '{' + ', '.join(f'{key!r}: %r' for key in keys) + '}'
+        
+    def __mod__(self, values: tuple) -> str:
+        return self.template % values
+        
+    def as_dict(self, values: tuple) -> Dict[str, Any]:
+        return dict(zip(self.keys, values))
+
+
 @dataclass
 class ROS2TraceEvent:
     """ROS2-compatible trace event"""
     timestamp: float
     event_name: str
     context_key: str
-    fields: str  # Formatted fields string
+    fields: Any  # Formatted fields, or the template when values is set
     cpu_id: int
     procname: str
     vtid: int
     vpid: int
+    values: Optional[tuple] = None  # Raw values for a log_event_values template
+    
+    def fields_text(self) -> Any:
+        """Fields as rendered in the text formats"""
+        if self.values is None:
+            return self.fields
+        return self.fields % self.values
+        
+    def fields_json(self) -> Any:
+        """Fields for JSON output; dict-shaped templates become objects"""
+        if self.values is None:
+            return self.fields
+        if isinstance(self.fields, DictFields):
+            return self.fields.as_dict(self.values)
+        return self.fields % self.values
     
     def to_ros2_format(self, delta: str = "+?.?????????") -> str:
         """Format event in ROS2-compatible format"""
@@ -56,7 +92,7 @@ class ROS2TraceEvent:
         return (f"[{timestamp_str}] ({delta}) {hostname} ros2:{self.event_name}: "
                 f"{{ cpu_id = {self.cpu_id} }}, "
                 f"{{ {procname_str}, vtid = {self.vtid}, vpid = {self.vpid} }}, "
-                f"{self.fields},,,,,,,,,,,,,,,,,,,,,,")
+                f"{self.fields_text()},,,,,,,,,,,,,,,,,,,,,,")
     
     def to_lttng_format(self, delta: float = 0.0) -> str:
         """Format event in LTTng-like format"""
@@ -66,7 +102,7 @@ class ROS2TraceEvent:
         hostname = platform.node() or "student-jetson"
         
         return (f"[{timestamp_str}] ({delta_str}) {hostname} "
-                f"{self.event_name}: {self.fields}")
+                f"{self.event_name}: {self.fields_text()}")
     
     def to_json(self) -> Dict[str, Any]:
         """Convert event to JSON format"""
@@ -74,7 +110,7 @@ class ROS2TraceEvent:
             'timestamp': self.timestamp,
             'event': self.event_name,
             'context': self.context_key,
-            'fields': self.fields,
+            'fields': self.fields_json(),
             'cpu_id': self.cpu_id,
             'procname': self.procname,
             'vtid': self.vtid,
@@ -93,15 +129,28 @@ class ROS2TraceLogger:
         self.console_output = True
         self.file_output = False
         self.file_path = "ros2_traces.csv"
+        self._trace_file = None  # Append handle on file_path, kept open across writes
         self.format = TraceFormat.ROS2_COMPATIBLE
         self.filter_patterns = []
         self.exclude_patterns = []
+        self._filter_cache: Dict[str, bool] = {}  # event name -> passes filters
         
         # ROS2-specific configuration
         self.hostname = platform.node() or "student-jetson"
         self.base_hours = 18  # Start time offset for realistic timestamps
         self.base_minutes = 44
         
+        # Asynchronous output (see enable_async_output); None means synchronous
+        self._queue: Optional[deque] = None
+        self._queue_capacity = 0
+        self._flush_batch_size = 4096
+        self._flush_interval = 0.05
+        self._flush_lock = threading.Lock()
+        self._flush_stop: Optional[threading.Event] = None
+        self._flush_wake: Optional[threading.Event] = None  # Set when a full batch is queued
+        self._flush_thread: Optional[threading.Thread] = None
+        self.dropped_events = 0
+        
     def enable(self):
         """Enable trace logging"""
         self.enabled = True
@@ -109,6 +158,7 @@ class ROS2TraceLogger:
     def disable(self):
         """Disable trace logging"""
         self.enabled = False
+        self.close()
         
     def set_console_output(self, enabled: bool):
         """Enable/disable console output"""
@@ -116,20 +166,119 @@ class ROS2TraceLogger:
         
     def enable_file_output(self, file_path: str):
         """Enable trace output to file"""
+        self._close_trace_file()
         self.file_output = True
         self.file_path = file_path
         
+    def close(self):
+        """Write out queued events and release the trace file handle.
+        
+        Logging may continue afterwards; the file is reopened on the next write.
+        """
+        self.flush()
+        self._close_trace_file()
+        
+    def _close_trace_file(self):
+        """Close the cached trace file handle, if any"""
+        if self._trace_file is not None:
+            self._trace_file.close()
+            self._trace_file = None
+            atexit.unregister(self.close)
+        
     def set_format(self, format_type: TraceFormat):
         """Set output format"""
         self.format = format_type
         
+    def enable_async_output(self, capacity: int = 65536, batch_size: int = 4096,
+                            flush_interval: float = 0.05):
+        """Queue events in a bounded ring and record/output them from a background thread.
+        
+        Producers resolve the execution context (so random draws happen in
+        program order, exactly as in synchronous mode) and append a tuple;
+        formatting and I/O are amortized over batches. The flush thread runs every flush_interval, or
+        as soon as a full batch is queued. When the ring is full the oldest
+        event is dropped and counted in dropped_events. Queued events are
+        drained at interpreter exit.
+        """
+        if self._queue is not None:
+            return
+        self._queue = deque(maxlen=capacity)
+        self._queue_capacity = capacity
+        self._flush_batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._flush_stop = threading.Event()
+        self._flush_wake = threading.Event()
+        self._flush_thread = threading.Thread(target=self._flush_loop,
+                                              name="trace_flush", daemon=True)
+        self._flush_thread.start()
+        atexit.register(self.disable_async_output)
+        
+    def disable_async_output(self):
+        """Drain queued events and return to synchronous output"""
+        if self._queue is None:
+            return
+        atexit.unregister(self.disable_async_output)
+        self._flush_stop.set()
+        self._flush_wake.set()
+        self._flush_thread.join()
+        self.flush()
+        self._close_trace_file()
+        self._queue = None
+        self._flush_thread = None
+        self._flush_stop = None
+        self._flush_wake = None
+        
+    def flush(self):
+        """Record and output all queued events (no-op in synchronous mode)"""
+        queue = self._queue
+        if queue is None:
+            return
+        
+        with self._flush_lock:
+            popleft = queue.popleft
+            while queue:
+                batch = []
+                try:
+                    for _ in range(self._flush_batch_size):
+                        batch.append(popleft())
+                except IndexError:
+                    pass
+                
+                records = []
+                for timestamp, event_name, fields, values, context_key, context in batch:
+                    records.append(self._record_event(event_name, fields, context_key,
+                                                      context, timestamp, values))
+                self._emit(records)
+                
+    def _flush_loop(self):
+        """Background thread body for asynchronous output"""
+        stop = self._flush_stop
+        wake = self._flush_wake
+        while not stop.is_set():
+            wake.wait(self._flush_interval)
+            wake.clear()
+            self.flush()
+            
+    def _enqueue(self, entry: tuple):
+        """Append an event to the async ring, counting overwritten entries"""
+        queue = self._queue
+        queued = len(queue)
+        if queued >= self._queue_capacity:
+            self.dropped_events += 1
+        queue.append(entry)
+        if queued + 1 == self._flush_batch_size:
+            # A full batch is waiting; hand it to the flush thread now
+            self._flush_wake.set()
+        
     def set_filter_patterns(self, patterns: List[str]):
         """Set event name patterns to include"""
         self.filter_patterns = patterns
+        self._filter_cache.clear()
         
     def set_exclude_patterns(self, patterns: List[str]):
         """Set event name patterns to exclude"""
         self.exclude_patterns = patterns
+        self._filter_cache.clear()
         
     def _format_timestamp(self, current_time: float) -> str:
         """Format timestamp in ROS2 style"""
@@ -155,6 +304,21 @@ class ROS2TraceLogger:
         self.last_timestamp = current_time
         return delta
         
+    def _passes_filters(self, event_name: str) -> bool:
+        """Check event name against include/exclude patterns"""
+        passes = self._filter_cache.get(event_name)
+        if passes is None:
+            passes = (not self.filter_patterns or any(p in event_name 
+                                                      for p in self.filter_patterns))
+            if passes and any(p in event_name for p in self.exclude_patterns):
+                passes = False
+            self._filter_cache[event_name] = passes
+        return passes
+        
+    def enabled_for(self, event_name: str) -> bool:
+        """Check whether an event would be recorded, so callers can skip building its fields"""
+        return self.enabled and self._passes_filters(event_name)
+        
     def log_event(self, event_name: str, fields: str, context_key: str = None,
                   custom_context: Dict[str, Any] = None):
         """Log a ROS2-compatible trace event"""
@@ -162,17 +326,61 @@ class ROS2TraceLogger:
             return
             
         # Check filters
-        if self.filter_patterns and not any(p in event_name 
-                                          for p in self.filter_patterns):
+        if not self._passes_filters(event_name):
             return
-            
-        if any(p in event_name for p in self.exclude_patterns):
+        
+        context = self._resolve_context(context_key, custom_context)
+        if self._queue is not None:
+            self._enqueue((time.time(), event_name, fields, None, context_key, context))
             return
         
-        # Handle context_key - convert ExecutionContext to string if needed
-        context_key_str = str(context_key) if context_key is not None else "global"
+        self._emit([self._record_event(event_name, fields, context_key, context)])
+        
+    def log_event_values(self, event_name: str, template: Any, values: tuple,
+                         context_key: str = None):
+        """Log an event whose fields are a %-template (str or DictFields) plus values.
         
-        # Get execution context
+        Hot paths pass a constant template plus a value tuple so nothing is
+        formatted (or allocated as a dict) unless the event is output. The
+        event keeps the raw values.
+        """
+        if not self.enabled or not self._passes_filters(event_name):
+            return
+        
+        context = self._resolve_context(context_key)
+        if self._queue is not None:
+            self._enqueue((time.time(), event_name, template, values, context_key, context))
+            return
+        
+        self._emit([self._record_event(event_name, template, context_key, context, None, values)])
+        
+    def log_event_batch(self, events: List[Tuple[str, str, Optional[str]]]):
+        """Log several (event_name, fields, context_key) events with one output flush"""
+        if not self.enabled:
+            return
+        
+        if self._queue is not None:
+            now = time.time()
+            for name, fields, context_key in events:
+                if self._passes_filters(name):
+                    self._enqueue((now, name, fields, None, context_key,
+                                   self._resolve_context(context_key)))
+            return
+        
+        now = time.time()
+        records = [self._record_event(name, fields, context_key,
+                                      self._resolve_context(context_key), now)
+                   for name, fields, context_key in events
+                   if self._passes_filters(name)]
+        if records:
+            self._emit(records)
+        
+    def _resolve_context(self, context_key: str = None,
+                         custom_context: Dict[str, Any] = None) -> Tuple[int, str, int, int]:
+        """Snapshot (cpu_id, procname, vtid, vpid) for an event being logged.
+        
+        Always called on the logging thread, since it draws from the global RNG.
+        """
         if custom_context:
             context = custom_context
         elif context_key:
@@ -200,43 +408,74 @@ class ROS2TraceLogger:
         if random.random() < 0.03:
             context['cpu_id'] = random.choice([0, 1, 2, 3, 4, 5])
         
-        current_time = time.time() - self.start_time
-        timestamp = self._format_timestamp(current_time)
+        return (context.get('cpu_id', 0), context.get('procname', 'default_proc'),
+                context.get('vtid', 6907), context.get('vpid', 6907))
+        
+    def _record_event(self, event_name: str, fields: str, context_key: str,
+                      context: Tuple[int, str, int, int],
+                      timestamp: float = None,
+                      values: Optional[tuple] = None) -> Tuple[ROS2TraceEvent, str, float]:
+        """Build and store an event; returns it with its delta and relative time"""
+        if timestamp is None:
+            timestamp = time.time()
+            
+        # Handle context_key - convert ExecutionContext to string if needed
+        context_key_str = str(context_key) if context_key is not None else "global"
+        
+        current_time = timestamp - self.start_time
         delta = self._calculate_delta(current_time)
         
         # Create event
+        cpu_id, procname, vtid, vpid = context
         event = ROS2TraceEvent(
-            timestamp=time.time(),
+            timestamp=timestamp,
             event_name=event_name,
             context_key=context_key_str,
             fields=fields,
-            cpu_id=context.get('cpu_id', 0),
-            procname=context.get('procname', 'default_proc'),
-            vtid=context.get('vtid', 6907),
-            vpid=context.get('vpid', 6907)
+            cpu_id=cpu_id,
+            procname=procname,
+            vtid=vtid,
+            vpid=vpid,
+            values=values
         )
         
         # Store event
         self.events.append(event)
         
-        # Console output
+        return event, delta, current_time
+    
+    def _format_event(self, event: ROS2TraceEvent, delta: str, current_time: float) -> str:
+        """Render an event in the configured output format"""
+        if self.format == TraceFormat.ROS2_COMPATIBLE:
+            return event.to_ros2_format(delta)
+        elif self.format == TraceFormat.LTTNG_LIKE:
+            return event.to_lttng_format(current_time)
+        else:
+            return json.dumps(event.to_json())
+    
+    def _emit(self, records: List[Tuple[ROS2TraceEvent, str, float]]):
+        """Write recorded events to the console and/or trace file"""
+        if not self.file_output and self._trace_file is not None:
+            # File output was switched off; release the handle
+            self._close_trace_file()
+        if not (self.console_output or self.file_output):
+            return
+        
+        text = '\n'.join([self._format_event(*record) for record in records]) + '\n'
+        
+        # Console output, one write per batch
         if self.console_output:
-            if self.format == TraceFormat.ROS2_COMPATIBLE:
-                print(event.to_ros2_format(delta))
-            elif self.format == TraceFormat.LTTNG_LIKE:
-                print(event.to_lttng_format(current_time))
-            else:
-                print(json.dumps(event.to_json()))
+            print(text, end='')
             
-        # File output
+        # File output: one write per batch through a handle opened once
         if self.file_output:
-            with open(self.file_path, 'a') as f:
-                if self.format == TraceFormat.ROS2_COMPATIBLE:
-                    f.write(event.to_ros2_format(delta) + '\n')
-                elif self.format == TraceFormat.LTTNG_LIKE:
-                    f.write(event.to_lttng_format(current_time) + '\n')
-                else:
-                    f.write(json.dumps(event.to_json()) + '\n')
+            f = self._trace_file
+            if f is None or f.name != self.file_path:
+                self._close_trace_file()
+                f = self._trace_file = open(self.file_path, 'a')
+                atexit.register(self.close)
+            f.write(text)
+            f.flush()
     
     # Convenience methods for ROS2-specific events
     def log_rcl_init(self, context_handle: str = None, version: str = "4.1.1"):
@@ -496,6 +735,7 @@ class ROS2TraceLogger:
     def get_events(self, start_time: Optional[float] = None,
                   end_time: Optional[float] = None) -> List[ROS2TraceEvent]:
         """Get events in time range"""
+        self.flush()
         if start_time is None:
             start_time = self.start_time
         if end_time is None:
@@ -506,20 +746,24 @@ class ROS2TraceLogger:
                 
     def get_events_by_name(self, event_name: str) -> List[ROS2TraceEvent]:
         """Get events by name"""
+        self.flush()
         return [e for e in self.events if e.event_name == event_name]
         
     def get_events_by_context(self, context_key: str) -> List[ROS2TraceEvent]:
         """Get events by context"""
+        self.flush()
         return [e for e in self.events if e.context_key == context_key]
         
     def clear(self):
         """Clear all events"""
+        self.flush()
         self.events.clear()
         self.start_time = time.time()
         self.last_timestamp = 0.0
         
     def save_traces(self, filename: str = None):
         """Save traces in ROS2-compatible format"""
+        self.flush()
         if filename is None:
             filename = self.file_path
             
@@ -531,6 +775,7 @@ class ROS2TraceLogger:
                 
     def save_json(self, file_path: str):
         """Save traces in JSON format for analysis"""
+        self.flush()
         data = {
             'metadata': {
                 'start_time': self.start_time,
@@ -547,6 +792,7 @@ class ROS2TraceLogger:
             
     def get_statistics(self) -> Dict[str, Any]:
         """Get trace statistics"""
+        self.flush()
         if not self.events:
             return {
                 'total_events': 0,
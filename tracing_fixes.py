@@ -3,51 +3,155 @@ Enhanced tracing fixes for ROS2 PDEVS simulation to match real ros2_tracing outp
 This file provides corrected tracing methods and patterns.
 """
 
+import os
 import time
 import random
-from typing import Dict, Any, Optional
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from tracing import trace_logger, ROS2TraceEvent
 
 
+# Read once at import: ROS2_PDEVS_TRACE=0 swaps the global enhanced tracer
+# for a no-op stand-in, so untraced runs skip handle and field work entirely
+TRACING_ENABLED = os.environ.get("ROS2_PDEVS_TRACE", "1") != "0"
+
+# Fields %-templates per event, in real ros2_tracing layout: string fields are
+# baked in double quotes, handles and numbers are left raw
+FIELD_TEMPLATES = {
+    "rcl_init": '{ context_handle = %s, version = "%s" }',
+    "rcl_node_init": '{ node_handle = %s, rmw_handle = %s, node_name = "%s", namespace = "%s" }',
+    "rmw_publisher_init": '{ rmw_publisher_handle = %s, gid = "%s" }',
+    "rcl_publisher_init": ('{ publisher_handle = %s, node_handle = %s, rmw_publisher_handle = %s, '
+                           'topic_name = "%s", queue_depth = %s }'),
+    "rmw_subscription_init": '{ rmw_subscription_handle = %s, gid = "%s" }',
+    "rcl_subscription_init": ('{ subscription_handle = %s, node_handle = %s, rmw_subscription_handle = %s, '
+                              'topic_name = "%s", queue_depth = %s }'),
+    "rclcpp_publish": '{ message = %s }',
+    "rcl_publish": '{ publisher_handle = %s, message = %s }',
+    "rmw_publish": '{ message = %s }',
+    "rmw_take": '{ rmw_subscription_handle = %s, message = %s, source_timestamp = "%d.%09d", taken = %s }',
+    "rcl_take": '{ message = %s }',
+    "rclcpp_take": '{ message = %s }',
+    "callback_start": '{ callback = %s, is_intra_process = %s }',
+    "callback_end": '{ callback = %s }',
+    "rclcpp_executor_wait_for_work": '{ timeout = %s }',
+    "rclcpp_executor_get_next_ready": '{ }',
+    "rclcpp_executor_execute": '{ handle = %s }',
+    "rclcpp_executor_spin_some": '{ nodes = %s }',
+}
+
+# Templates of the per-message and executor events, resolved once so hot
+# paths skip the by-name table lookup (event names themselves are literals,
+# which the compiler already interns)
+_MESSAGE_FIELDS = FIELD_TEMPLATES["rmw_publish"]  # Same layout for rclcpp_publish, rcl_take, rclcpp_take
+_RMW_TAKE_FIELDS = FIELD_TEMPLATES["rmw_take"]
+_CALLBACK_START_FIELDS = FIELD_TEMPLATES["callback_start"]
+_CALLBACK_END_FIELDS = FIELD_TEMPLATES["callback_end"]
+_WAIT_FOR_WORK_FIELDS = FIELD_TEMPLATES["rclcpp_executor_wait_for_work"]
+_GET_NEXT_READY_FIELDS = FIELD_TEMPLATES["rclcpp_executor_get_next_ready"]
+_EXECUTE_FIELDS = FIELD_TEMPLATES["rclcpp_executor_execute"]
+_SPIN_SOME_FIELDS = FIELD_TEMPLATES["rclcpp_executor_spin_some"]
+
+# Executor events repeat a handful of int values over a run; their fields
+# strings are memoized per value (bounded, as a guard against open domains)
+EXEC_WAIT_CACHE: Dict[int, str] = {}
+EXEC_SPIN_SOME_CACHE: Dict[int, str] = {}
+_EXEC_CACHE_LIMIT = 256
+
+
+def _memo_fields(cache: Dict[int, str], template: str, value: Any) -> str:
+    """Fields string of a one-value template, memoized for int values"""
+    if type(value) is not int:
+        return template % (value,)
+    fields = cache.get(value)
+    if fields is None:
+        fields = template % (value,)
+        if len(cache) < _EXEC_CACHE_LIMIT:
+            cache[value] = fields
+    return fields
+
+
+# Uniform draws are taken from the global random state in batches, so
+# random.seed() still reproduces a run, and consumed from a buffer
+_RAND_BATCH = 4096
+_HANDLE_STEP_MIN = 0x1000
+_HANDLE_STEP_SPAN = 0xFFFFF - 0x1000 + 1
+
+
+# GID array layout: fixed prefix and zero runs, with the four host bytes and
+# two entity bytes left as slots
+_GID_TEMPLATE = ("[ [0] = 1, [1] = 15, [2] = 62, [3] = 8, [4] = %d, [5] = %d, [6] = %d, [7] = %d, "
+                 "[8] = 0, [9] = 0, [10] = 0, [11] = 0, [12] = 0, [13] = 0, [14] = 0, [15] = 0, "
+                 "[16] = %d, [17] = %d, [18] = 0, [19] = 0, [20] = 0, [21] = 0, [22] = 0, [23] = 0 ]")
+
+
+def _uniform_batch() -> List[float]:
+    """A batch of uniform [0, 1) floats drawn in one pass"""
+    rand = random.random
+    return [rand() for _ in range(_RAND_BATCH)]
+
+
+@dataclass(slots=True)
+class TracedNode:
+    """Handles issued for a traced node"""
+    node_handle: str
+    rmw_handle: str
+
+
+@dataclass(slots=True)
+class TracedPublisher:
+    """Handles issued for a traced publisher"""
+    publisher_handle: str
+    rmw_publisher_handle: str
+    node_handle: str
+    rcl_publish_fields: str = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        # rcl_publish fields with this publisher's handle baked in
+        self.rcl_publish_fields = FIELD_TEMPLATES["rcl_publish"].replace('%s', self.publisher_handle, 1)
+
+
+@dataclass(slots=True)
+class TracedSubscription:
+    """Handles issued for a traced subscription"""
+    subscription_handle: str
+    rmw_subscription_handle: str
+    node_handle: str
+
+
 class EnhancedROS2TraceLogger:
     """Enhanced tracer that matches real ROS2 tracing patterns exactly"""
+    __slots__ = ('trace_logger', 'handle_counter', 'message_handles', 'node_handles',
+                 'pub_handles', 'sub_handles', 'rmw_handles', '_rand_buf')
     
     def __init__(self):
         self.trace_logger = trace_logger
+        # Plain int on purpose: at 48 bits the add stays on CPython's small
+        # fixed-digit path, while array/NumPy uint64 cells box on every access
         self.handle_counter = 0xAAAAE0000000
         self.message_handles = {}
-        self.node_handles = {}
-        self.pub_handles = {}
-        self.sub_handles = {}
+        self.node_handles: Dict[str, TracedNode] = {}
+        self.pub_handles: Dict[Tuple[str, str], TracedPublisher] = {}  # (node_name, topic_name) -> handles
+        self.sub_handles: Dict[Tuple[str, str], TracedSubscription] = {}  # (node_name, topic_name) -> handles
         self.rmw_handles = {}
+        self._rand_buf: List[float] = []  # Pending uniform draws, consumed from the end
         
     def _next_handle(self, base: int = 0xAAAAE0000000) -> str:
         """Generate realistic handle addresses"""
-        self.handle_counter += random.randint(0x1000, 0xFFFFF)
-        return f"0x{self.handle_counter:X}"
-        
-    def _format_ros2_fields(self, **fields) -> str:
-        """Format fields exactly like real ROS2 traces"""
-        formatted_fields = []
-        for key, value in fields.items():
-            if isinstance(value, str) and not value.startswith('0x'):
-                # String values get double quotes
-                formatted_fields.append(f'{key} = "{value}"')
-            else:
-                formatted_fields.append(f'{key} = {value}')
-        
-        return "{ " + ", ".join(formatted_fields) + " }"
-    
+        buf = self._rand_buf
+        if not buf:
+            buf.extend(_uniform_batch())
+        handle = self.handle_counter = self.handle_counter + _HANDLE_STEP_MIN + int(buf.pop() * _HANDLE_STEP_SPAN)
+        return "0x%X" % handle
+        
     def log_system_init(self):
         """Log complete system initialization sequence"""
         # 1. RCL initialization
         context_handle = self._next_handle()
-        self.trace_logger.log_event(
-            "rcl_init", 
-            self._format_ros2_fields(
-                context_handle=context_handle,
-                version="4.1.1"
-            )
+        self.trace_logger.log_event_values(
+            "rcl_init",
+            FIELD_TEMPLATES["rcl_init"],
+            (context_handle, "4.1.1")
         )
         
         return context_handle
@@ -57,20 +161,13 @@ class EnhancedROS2TraceLogger:
         node_handle = self._next_handle()
         rmw_handle = self._next_handle()
         
-        self.node_handles[node_name] = {
-            'node_handle': node_handle,
-            'rmw_handle': rmw_handle
-        }
+        self.node_handles[node_name] = TracedNode(node_handle, rmw_handle)
         
         # Node init event
-        self.trace_logger.log_event(
+        self.trace_logger.log_event_values(
             "rcl_node_init",
-            self._format_ros2_fields(
-                node_handle=node_handle,
-                rmw_handle=rmw_handle,
-                node_name=node_name,
-                namespace=namespace
-            )
+            FIELD_TEMPLATES["rcl_node_init"],
+            (node_handle, rmw_handle, node_name, namespace)
         )
         
         return node_handle
@@ -79,49 +176,42 @@ class EnhancedROS2TraceLogger:
                                    type_name: str = "sensor_msgs/msg/Image",
                                    queue_depth: int = 1000):
         """Log complete publisher initialization sequence"""
+        log = self.trace_logger.log_event_values
         
         # Get or create node handles
-        if node_name not in self.node_handles:
+        node_handles = self.node_handles
+        if node_name not in node_handles:
             self.log_node_initialization(node_name)
         
-        node_handle = self.node_handles[node_name]['node_handle']
+        node_handle = node_handles[node_name].node_handle
         
         # 1. RMW publisher init
         rmw_publisher_handle = self._next_handle()
         gid = self._generate_realistic_gid()
         
-        self.trace_logger.log_event(
+        log(
             "rmw_publisher_init",
-            self._format_ros2_fields(
-                rmw_publisher_handle=rmw_publisher_handle,
-                gid=gid
-            )
+            FIELD_TEMPLATES["rmw_publisher_init"],
+            (rmw_publisher_handle, gid)
         )
         
         # 2. Initial rmw_publish (empty)
         message_handle = self._next_handle(0xFFFFD0000000)
-        self.trace_logger.log_event(
+        log(
             "rmw_publish",
-            self._format_ros2_fields(message=message_handle)
+            FIELD_TEMPLATES["rmw_publish"],
+            (message_handle,)
         )
         
         # 3. RCL publisher init
         publisher_handle = self._next_handle()
-        self.trace_logger.log_event(
+        log(
             "rcl_publisher_init",
-            self._format_ros2_fields(
-                publisher_handle=publisher_handle,
-                node_handle=node_handle,
-                rmw_publisher_handle=rmw_publisher_handle,
-                topic_name=topic_name,
-                queue_depth=queue_depth
-            )
+            FIELD_TEMPLATES["rcl_publisher_init"],
+            (publisher_handle, node_handle, rmw_publisher_handle, topic_name, queue_depth)
         )
         
-        self.pub_handles[f"{node_name}:{topic_name}"] = {
-            'publisher_handle': publisher_handle,
-            'rmw_publisher_handle': rmw_publisher_handle
-        }
+        self.pub_handles[(node_name, topic_name)] = TracedPublisher(publisher_handle, rmw_publisher_handle, node_handle)
         
         return publisher_handle
     
@@ -129,41 +219,33 @@ class EnhancedROS2TraceLogger:
                                       type_name: str = "sensor_msgs/msg/Image",
                                       queue_depth: int = 1000):
         """Log complete subscription initialization sequence"""
+        log = self.trace_logger.log_event_values
         
-        if node_name not in self.node_handles:
+        node_handles = self.node_handles
+        if node_name not in node_handles:
             self.log_node_initialization(node_name)
             
-        node_handle = self.node_handles[node_name]['node_handle']
+        node_handle = node_handles[node_name].node_handle
         
         # 1. RMW subscription init
         rmw_subscription_handle = self._next_handle()
         gid = self._generate_realistic_gid()
         
-        self.trace_logger.log_event(
+        log(
             "rmw_subscription_init",
-            self._format_ros2_fields(
-                rmw_subscription_handle=rmw_subscription_handle,
-                gid=gid
-            )
+            FIELD_TEMPLATES["rmw_subscription_init"],
+            (rmw_subscription_handle, gid)
         )
         
         # 2. RCL subscription init
         subscription_handle = self._next_handle()
-        self.trace_logger.log_event(
+        log(
             "rcl_subscription_init",
-            self._format_ros2_fields(
-                subscription_handle=subscription_handle,
-                node_handle=node_handle,
-                rmw_subscription_handle=rmw_subscription_handle,
-                topic_name=topic_name,
-                queue_depth=queue_depth
-            )
+            FIELD_TEMPLATES["rcl_subscription_init"],
+            (subscription_handle, node_handle, rmw_subscription_handle, topic_name, queue_depth)
         )
         
-        self.sub_handles[f"{node_name}:{topic_name}"] = {
-            'subscription_handle': subscription_handle,
-            'rmw_subscription_handle': rmw_subscription_handle
-        }
+        self.sub_handles[(node_name, topic_name)] = TracedSubscription(subscription_handle, rmw_subscription_handle, node_handle)
         
         return subscription_handle
     
@@ -171,101 +253,106 @@ class EnhancedROS2TraceLogger:
                            message_data: Dict[str, Any]):
         """Log complete publish sequence matching real ROS2"""
         
-        key = f"{node_name}:{topic_name}"
-        if key not in self.pub_handles:
+        handles = self.pub_handles.get((node_name, topic_name))
+        if handles is None:
+            # First publish on this topic: initialize the publisher
             self.log_publisher_initialization(node_name, topic_name)
-        
-        handles = self.pub_handles[key]
-        node_handle = self.node_handles[node_name]['node_handle']
+            handles = self.pub_handles[(node_name, topic_name)]
         
         # Generate message handle
         message_handle = self._next_handle(0xFFFFD0000000)
         self.message_handles[message_handle] = message_data
         
-        # 1. RCLCPP publish
-        self.trace_logger.log_event(
-            "rclcpp_publish",
-            self._format_ros2_fields(message=message_handle)
-        )
-        
-        # 2. RCL publish
-        self.trace_logger.log_event(
-            "rcl_publish", 
-            self._format_ros2_fields(
-                publisher_handle=handles['publisher_handle'],
-                message=message_handle
-            )
-        )
-        
-        # 3. RMW publish
-        self.trace_logger.log_event(
-            "rmw_publish",
-            self._format_ros2_fields(message=message_handle)
-        )
+        # RCLCPP -> RCL -> RMW publish, emitted as one batch; the rclcpp and
+        # rmw events carry the same fields string
+        tracer = self.trace_logger
+        if tracer.enabled:
+            message_fields = _MESSAGE_FIELDS % (message_handle,)
+            tracer.log_event_batch([
+                ("rclcpp_publish", message_fields, None),
+                ("rcl_publish", handles.rcl_publish_fields % (message_handle,), None),
+                ("rmw_publish", message_fields, None),
+            ])
         
         return message_handle
     
+    def bind_publish_sequence(self, node_name: str, topic_name: str) -> Callable[[Dict[str, Any]], str]:
+        """Publish-sequence logger specialized for one (node, topic) pair.
+        
+        Initializes the publisher if needed; the returned function takes the
+        message data and behaves like log_publish_sequence for that pair, with
+        handles and templates resolved up front.
+        """
+        handles = self.pub_handles.get((node_name, topic_name))
+        if handles is None:
+            self.log_publisher_initialization(node_name, topic_name)
+            handles = self.pub_handles[(node_name, topic_name)]
+        
+        rcl_publish_fields = handles.rcl_publish_fields
+        message_handles = self.message_handles
+        next_handle = self._next_handle
+        
+        def publish_sequence(message_data: Dict[str, Any]) -> str:
+            message_handle = next_handle(0xFFFFD0000000)
+            message_handles[message_handle] = message_data
+            tracer = self.trace_logger
+            if tracer.enabled:
+                message_fields = _MESSAGE_FIELDS % (message_handle,)
+                tracer.log_event_batch([
+                    ("rclcpp_publish", message_fields, None),
+                    ("rcl_publish", rcl_publish_fields % (message_handle,), None),
+                    ("rmw_publish", message_fields, None),
+                ])
+            return message_handle
+        
+        return publish_sequence
+    
     def log_subscription_callback(self, node_name: str, topic_name: str,
                                 message_handle: str, taken: int = 1):
         """Log subscription callback sequence"""
+        tracer = self.trace_logger
         
-        key = f"{node_name}:{topic_name}"
-        if key not in self.sub_handles:
+        handles = self.sub_handles.get((node_name, topic_name))
+        if handles is None:
+            # First take on this topic: initialize the subscription
             self.log_subscription_initialization(node_name, topic_name)
-            
-        handles = self.sub_handles[key]
+            handles = self.sub_handles[(node_name, topic_name)]
         
         # 1. RMW take
-        source_timestamp = time.time()
-        self.trace_logger.log_event(
-            "rmw_take",
-            self._format_ros2_fields(
-                rmw_subscription_handle=handles['rmw_subscription_handle'],
-                message=message_handle,
-                source_timestamp=f"{source_timestamp:.9f}",
-                taken=taken
-            )
-        )
-        
-        if taken == 1:
-            # 2. RCL take
-            self.trace_logger.log_event(
-                "rcl_take",
-                self._format_ros2_fields(message=message_handle)
-            )
-            
-            # 3. RCLCPP take
-            self.trace_logger.log_event(
-                "rclcpp_take",
-                self._format_ros2_fields(message=message_handle)
-            )
-            
-            # 4. Callback start
-            callback_handle = self._next_handle()
-            self.trace_logger.log_event(
-                "callback_start",
-                self._format_ros2_fields(
-                    callback=callback_handle,
-                    is_intra_process=0
-                )
-            )
-            
-            return callback_handle
-            
-        return None
+        source_sec, source_nsec = divmod(time.time_ns(), 1_000_000_000)
+        take_values = (handles.rmw_subscription_handle, message_handle, source_sec, source_nsec, taken)
+        
+        if taken != 1:
+            tracer.log_event_values("rmw_take", _RMW_TAKE_FIELDS, take_values)
+            return None
+        
+        # 2-4. RCL take, RCLCPP take and callback start, emitted with the RMW
+        # take as one batch; both take events carry the same fields string
+        callback_handle = self._next_handle()
+        if tracer.enabled:
+            message_fields = _MESSAGE_FIELDS % (message_handle,)
+            tracer.log_event_batch([
+                ("rmw_take", _RMW_TAKE_FIELDS % take_values, None),
+                ("rcl_take", message_fields, None),
+                ("rclcpp_take", message_fields, None),
+                ("callback_start", _CALLBACK_START_FIELDS % (callback_handle, 0), None),
+            ])
+        
+        return callback_handle
     
     def log_callback_end(self, callback_handle: str):
         """Log callback completion"""
+        # Single-field event: format once and take the plain log_event path
         self.trace_logger.log_event(
             "callback_end",
-            self._format_ros2_fields(callback=callback_handle)
+            _CALLBACK_END_FIELDS % callback_handle
         )
     
     def log_executor_wait_for_work(self, timeout: int = 0, context_key: str = "executor"):
         """Log executor wait_for_work event"""
         self.trace_logger.log_event(
             "rclcpp_executor_wait_for_work",
-            self._format_ros2_fields(timeout=timeout),
+            _memo_fields(EXEC_WAIT_CACHE, _WAIT_FOR_WORK_FIELDS, timeout),
             context_key
         )
     
@@ -273,15 +360,16 @@ class EnhancedROS2TraceLogger:
         """Log executor get_next_ready event"""
         self.trace_logger.log_event(
             "rclcpp_executor_get_next_ready",
-            "{ }",
+            _GET_NEXT_READY_FIELDS,
             context_key
         )
     
     def log_executor_execute(self, handle: str, context_key: str = "executor"):
         """Log executor execute event"""
-        self.trace_logger.log_event(
+        self.trace_logger.log_event_values(
             "rclcpp_executor_execute",
-            self._format_ros2_fields(handle=handle),
+            _EXECUTE_FIELDS,
+            (handle,),
             context_key
         )
     
@@ -289,20 +377,48 @@ class EnhancedROS2TraceLogger:
         """Log executor spin_some event"""
         self.trace_logger.log_event(
             "rclcpp_executor_spin_some",
-            self._format_ros2_fields(nodes=nodes),
+            _memo_fields(EXEC_SPIN_SOME_CACHE, _SPIN_SOME_FIELDS, nodes),
             context_key
         )
     
     def _generate_realistic_gid(self) -> str:
         """Generate realistic GID array like real ROS2"""
-        gid_values = [1, 15, 62, 8] + [random.randint(10, 35) for _ in range(4)]
-        gid_values.extend([0] * 8)  # zeros for bytes 8-15
-        gid_values.extend([random.randint(1, 20) for _ in range(2)])  # entity bytes
-        gid_values.extend([0] * 6)  # trailing zeros
-        
-        gid_str = "[ " + ", ".join(f"[{i}] = {val}" for i, val in enumerate(gid_values)) + " ]"
-        return gid_str
+        buf = self._rand_buf
+        if len(buf) < 6:
+            buf.extend(_uniform_batch())
+        r0, r1, r2, r3, r4, r5 = buf[-6:]
+        del buf[-6:]
+        return _GID_TEMPLATE % (
+            10 + int(r0 * 26), 10 + int(r1 * 26), 10 + int(r2 * 26), 10 + int(r3 * 26),  # 10..35
+            1 + int(r4 * 20), 1 + int(r5 * 20)  # entity bytes, 1..20
+        )
+
+
+def _noop(*args, **kwargs) -> None:
+    """Accept any arguments and do nothing"""
+    return None
+
+
+class NullROS2TraceLogger:
+    """Enhanced tracer stand-in for untraced runs; every log method returns None"""
+    __slots__ = ()
+    
+    log_system_init = staticmethod(_noop)
+    log_node_initialization = staticmethod(_noop)
+    log_publisher_initialization = staticmethod(_noop)
+    log_subscription_initialization = staticmethod(_noop)
+    log_publish_sequence = staticmethod(_noop)
+    log_subscription_callback = staticmethod(_noop)
+    log_callback_end = staticmethod(_noop)
+    log_executor_wait_for_work = staticmethod(_noop)
+    log_executor_get_next_ready = staticmethod(_noop)
+    log_executor_execute = staticmethod(_noop)
+    log_executor_spin_some = staticmethod(_noop)
+    
+    def bind_publish_sequence(self, node_name: str, topic_name: str) -> Callable[[Dict[str, Any]], None]:
+        """No-op publish-sequence logger"""
+        return _noop
 
 
 # Create enhanced global tracer instance
-enhanced_tracer = EnhancedROS2TraceLogger()
\ No newline at end of file
+enhanced_tracer = EnhancedROS2TraceLogger() if TRACING_ENABLED else NullROS2TraceLogger()
\ No newline at end of file